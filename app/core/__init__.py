@@ -8,7 +8,7 @@ from app.core.exceptions import (
     ValidationError,
 )
 from app.core.llm import configure_default_lm, get_lm
-from app.core.logging import get_logger, setup_logging
+from app.core.logging import get_logger, setup_logging, shutdown_logging
 
 __all__ = [
     "ApplicationError",
@@ -21,4 +21,5 @@ __all__ = [
     "get_rate_limiter",
     "get_settings",
     "setup_logging",
+    "shutdown_logging",
 ]
@@ -10,6 +10,7 @@ from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 Environment = Literal["development", "staging", "production"]
+RateLimitStrategy = Literal["fixed-window", "moving-window", "sliding-window-counter"]
 
 
 class Settings(BaseSettings):
@@ -18,6 +19,9 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
         case_sensitive=True,
         extra="ignore",
+        frozen=True,
+        # compile the validator on first Settings() (i.e. first get_settings()), not at import
+        defer_build=True,
     )
 
     # app
@@ -29,9 +33,9 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
 
-    # CORS / hosts
-    ALLOWED_ORIGINS: list[str] = Field(default_factory=lambda: ["http://localhost:3000"])
-    ALLOWED_HOSTS: list[str] = Field(default_factory=lambda: ["localhost", "127.0.0.1"])
+    # CORS / hosts — tuples, so the frozen settings are immutable all the way down
+    ALLOWED_ORIGINS: tuple[str, ...] = ("http://localhost:3000",)
+    ALLOWED_HOSTS: tuple[str, ...] = ("localhost", "127.0.0.1")
 
     # LM providers
     OPENAI_API_KEY: str
@@ -46,6 +50,25 @@ class Settings(BaseSettings):
     LM_MAX_TOKENS: int = 1024
     LM_TEMPERATURE: float = 0.0
     LM_TIMEOUT_S: float = 30.0
+    LM_CONNECT_TIMEOUT_S: float = 5.0
+    # per-call ceiling for the text utilities (concise / keywords / urgency);
+    # past it they fall back locally rather than wait out the provider's tail
+    TEXT_LM_TIMEOUT_S: float = Field(default=8.0, gt=0)
+    # retries for transient provider errors only (rate limits, timeouts,
+    # connection drops, 5xx), with exponential backoff; parse errors never retry
+    LM_NUM_RETRIES: int = Field(default=3, ge=0)
+    # pooled connections to the LM providers; keep max at ~2x the peak number
+    # of concurrent LM calls (CHAT_MAX_INFLIGHT runs x up to 5 branches each)
+    LM_MAX_CONNECTIONS: int = Field(default=200, ge=1)
+    LM_MAX_KEEPALIVE: int = Field(default=100, ge=0)
+    # idle pooled connections live this long; httpx's 5s default drops them
+    # between bursts and the next call pays the TCP + TLS handshake again
+    LM_KEEPALIVE_EXPIRY_S: float = Field(default=60.0, gt=0)
+    # exact-match response cache for deterministic (temperature 0) calls;
+    # LM_CACHE_DIR adds a disk tier that survives restarts
+    LM_CACHE_ENABLED: bool = True
+    LM_CACHE_MAX_ENTRIES: int = Field(default=10_000, ge=1)
+    LM_CACHE_DIR: str | None = None
 
     # storage
     DATABASE_URL: str | None = None
@@ -53,6 +76,11 @@ class Settings(BaseSettings):
 
     # rate limiting (slowapi reads these)
     RATE_LIMIT: str = "100/minute"
+    # moving-window = true rolling window, one atomic Lua call per check against
+    # a per-key list capped at the limit and expired with the window
+    RATE_LIMIT_STRATEGY: RateLimitStrategy = "moving-window"
+    # hits a worker reserves per Redis round-trip and spends locally; 1 disables
+    RATE_LIMIT_LOCAL_BUDGET: int = Field(default=10, ge=1)
 
     # logs
     LOG_LEVEL: str = "INFO"
@@ -60,6 +88,16 @@ class Settings(BaseSettings):
 
     # business knobs
     MAX_CONVERSATION_HISTORY: int = 500
+    # prompt tokens of recent messages a micro insight may spend
+    INSIGHT_TOKEN_BUDGET: int = Field(default=6000, ge=1)
+    # one LM call for micro-insight sentiment + insight instead of two
+    INSIGHT_FUSED: bool = True
+    # clients run_many works on at once; each holds one fast-tier call at a time
+    INSIGHT_MAX_CONCURRENCY: int = Field(default=8, ge=1)
+    # one LM call for triage + risk + sentiment + event instead of four
+    CHAT_FUSED_ANALYSIS: bool = False
+    # chat graph runs in flight per worker; extra requests queue for a slot
+    CHAT_MAX_INFLIGHT: int = Field(default=20, ge=1)
 
     # observability — optional
     SENTRY_DSN: str | None = None
@@ -70,9 +108,9 @@ class Settings(BaseSettings):
 
     @staticmethod
     def utc_now_iso() -> str:
-        return datetime.now(timezone.utc).isoformat()
+        return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
 
 
-@lru_cache
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings()  # type: ignore[call-arg]
@@ -6,10 +6,10 @@ from typing import Any
 
 from fastapi import Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.core.logging import get_logger
+from app.core.responses import ORJSONResponse
 
 logger = get_logger(__name__)
 
@@ -46,21 +46,26 @@ def _err_body(kind: str, exc: ApplicationError, **extra: Any) -> dict[str, Any]:
     }
 
 
-async def validation_exception_handler(request: Request, exc: ValidationError) -> JSONResponse:
+def validation_error_response(exc: ValidationError) -> ORJSONResponse:
+    """The 400 body for a ValidationError, whether raised or returned early."""
+    return ORJSONResponse(status_code=400, content=_err_body("validation_error", exc, details=exc.details))
+
+
+async def validation_exception_handler(request: Request, exc: ValidationError) -> ORJSONResponse:
     logger.warning("validation_error", path=request.url.path, code=exc.error_code, message=exc.message)
-    return JSONResponse(status_code=400, content=_err_body("validation_error", exc, details=exc.details))
+    return validation_error_response(exc)
 
 
-async def service_exception_handler(request: Request, exc: ServiceError) -> JSONResponse:
+async def service_exception_handler(request: Request, exc: ServiceError) -> ORJSONResponse:
     logger.error("service_error", path=request.url.path, code=exc.error_code, message=exc.message)
     body = _err_body("service_error", exc, details=exc.details)
     body["error"]["message"] = "Service temporarily unavailable"
-    return JSONResponse(status_code=503, content=body)
+    return ORJSONResponse(status_code=503, content=body)
 
 
-async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> JSONResponse:
+async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> ORJSONResponse:
     logger.warning("http_error", path=request.url.path, status=exc.status_code, detail=str(exc.detail))
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": {
@@ -74,9 +79,9 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException)
 
 async def request_validation_exception_handler(
     request: Request, exc: RequestValidationError
-) -> JSONResponse:
+) -> ORJSONResponse:
     logger.warning("request_validation_error", path=request.url.path, errors=exc.errors())
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "error": {
@@ -89,9 +94,9 @@ async def request_validation_exception_handler(
     )
 
 
-async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def general_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
     logger.error("unexpected_error", path=request.url.path, exc_type=type(exc).__name__, exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": {
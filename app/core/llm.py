@@ -1,22 +1,40 @@
 """DSPy LM provider — one place to wire up the language models.
 
 Tiers:
-  main    — chat triage, risk, sentiment, response generation
-  fast    — micro insights, classification, anything cheap
+  main    — chat triage, risk, response generation
+  fast    — chat sentiment / event detection, critic, micro insights,
+            classification, anything cheap
   summary — chat summarization
   report  — long-form firm-wide reports (Gemini Pro)
 
 Callers ask for a tier; we hand back a configured dspy.LM. The default tier
 is also installed onto dspy globally so any signature picks it up unless
 overridden via dspy.context(lm=...).
+
+All tiers share one pooled HTTP client per process (installed into LiteLLM
+at startup), so connections and TLS sessions are warm before the first
+request and reused across calls.
+
+Signatures go through DSPy's JSONAdapter, which asks the provider for
+structured output against the signature's own schema (falling back to
+JSON mode where it can't), so typed fields come back parsed instead of
+being scraped out of free text. The adapter's per-signature work (system
+prompt text, response schema) is built once per signature and reused.
+
+Deterministic (temperature 0) calls go through DSPy's exact-match response
+cache, keyed on the full request (model, prompt, inputs), so a repeat of
+"ok" / "thanks" is served without a round-trip. Sampled calls skip it —
+caching them would pin one draft forever.
 """
 
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Literal
+from functools import lru_cache, partial
+from typing import Any, Literal
 
 import dspy
+import httpx
+import litellm
 
 from app.core.config import get_settings
 
@@ -42,23 +60,120 @@ def _model_for(tier: Tier) -> str:
     }[tier]
 
 
-@lru_cache(maxsize=8)
-def get_lm(tier: Tier = "main") -> dspy.LM:
+@lru_cache(maxsize=16)
+def get_lm(
+    tier: Tier = "main",
+    temperature: float | None = None,
+    max_tokens: int | None = None,
+) -> dspy.LM:
+    """Cached LM for a tier; temperature / max_tokens override the defaults.
+
+    Built on first call, not at import, so modules can resolve their LM
+    lazily in forward() and importing a feature never reads API keys.
+    """
     settings = get_settings()
     model = _model_for(tier)
     api_key = _api_key_for(model)
     if api_key is None and model.startswith(("openai/", "gemini/")):
         raise RuntimeError(f"no API key configured for {model}")
 
+    temperature = settings.LM_TEMPERATURE if temperature is None else temperature
     return dspy.LM(
         model=model,
         api_key=api_key,
-        max_tokens=settings.LM_MAX_TOKENS,
-        temperature=settings.LM_TEMPERATURE,
+        max_tokens=settings.LM_MAX_TOKENS if max_tokens is None else max_tokens,
+        temperature=temperature,
         timeout=settings.LM_TIMEOUT_S,
+        num_retries=settings.LM_NUM_RETRIES,
+        cache=settings.LM_CACHE_ENABLED and temperature == 0,
+    )
+
+
+class CachedJSONAdapter(dspy.JSONAdapter):
+    """JSONAdapter that memoizes what only depends on the signature.
+
+    The stock adapter re-renders the system message and rebuilds the
+    structured-output pydantic model on every call — a couple of ms each,
+    for text that never changes between calls of the same predictor.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._system_message = lru_cache(maxsize=64)(
+            partial(dspy.JSONAdapter.format_system_message, self)
+        )
+        self._response_formats: dict[tuple[Any, str], Any] = {}
+
+    def format_system_message(self, signature: type[dspy.Signature]) -> str:
+        return self._system_message(signature)
+
+    def _prepare_response_format(
+        self, lm: Any, lm_kwargs: dict[str, Any], signature: type[dspy.Signature]
+    ) -> None:
+        # the choice depends on the model's capabilities as well as the signature
+        key = (signature, lm.model)
+        if key not in self._response_formats:
+            probe: dict[str, Any] = {}
+            super()._prepare_response_format(lm, probe, signature)
+            self._response_formats[key] = probe.get("response_format")
+        fmt = self._response_formats[key]
+        if fmt is not None:
+            lm_kwargs["response_format"] = fmt
+
+
+def configure_cache() -> None:
+    """Size DSPy's response cache from settings. Call once at startup.
+
+    DSPy's default is a million in-memory entries plus a 30 GB
+    disk cache under ~/.dspy_cache; we keep memory bounded and only touch
+    disk when LM_CACHE_DIR is set.
+    """
+    settings = get_settings()
+    dspy.configure_cache(
+        enable_disk_cache=bool(settings.LM_CACHE_DIR),
+        enable_memory_cache=settings.LM_CACHE_ENABLED,
+        disk_cache_dir=settings.LM_CACHE_DIR or None,
+        memory_max_entries=settings.LM_CACHE_MAX_ENTRIES,
     )
 
 
+def count_tokens(text: str, tier: Tier = "main") -> int:
+    """Prompt tokens `text` costs on the tier's model, via LiteLLM's tokenizer
+    for that provider (tiktoken for OpenAI, bundled locally)."""
+    return litellm.token_counter(model=_model_for(tier), text=text)
+
+
 def configure_default_lm() -> None:
-    """Install the main-tier LM as DSPy's global default. Call once at startup."""
-    dspy.configure(lm=get_lm("main"))
+    """Install the main-tier LM and the JSON adapter as DSPy's global
+    defaults. Call once at startup."""
+    configure_cache()
+    dspy.configure(lm=get_lm("main"), adapter=CachedJSONAdapter())
+
+
+def open_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Install pooled sync + async HTTP clients into LiteLLM. Call once at startup.
+
+    DSPy predictors run in worker threads and hit the sync client; anything
+    calling the async LiteLLM API gets the async one.
+    """
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.LM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LM_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LM_KEEPALIVE_EXPIRY_S,
+    )
+    timeout = httpx.Timeout(settings.LM_TIMEOUT_S, connect=settings.LM_CONNECT_TIMEOUT_S)
+    # HTTP/2 multiplexes the graph's parallel branches over a few connections
+    litellm.client_session = httpx.Client(limits=limits, timeout=timeout, http2=True)
+    litellm.aclient_session = httpx.AsyncClient(limits=limits, timeout=timeout, http2=True)
+    return litellm.client_session, litellm.aclient_session
+
+
+async def close_http_clients() -> None:
+    """Close whatever open_http_clients() installed. Call once at shutdown."""
+    if litellm.client_session is not None:
+        litellm.client_session.close()
+        litellm.client_session = None
+    if litellm.aclient_session is not None:
+        await litellm.aclient_session.aclose()
+        litellm.aclient_session = None
@@ -3,20 +3,43 @@
 structlog runs both as the structlog logger and as the formatter for the
 stdlib logger, so third-party libs (uvicorn, openai, etc.) get the same
 treatment.
+
+Callers only enqueue records; a QueueListener thread renders them and does
+the stdout write, so request handlers never block on the stream lock.
 """
 
 from __future__ import annotations
 
 import logging
+import logging.handlers
+import queue
 import sys
+from functools import lru_cache
 from typing import Any
 
 import structlog
 
 from app.core.config import get_settings
 
+_listener: logging.handlers.QueueListener | None = None
+
+
+class _PassthroughQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record as-is.
+
+    The stock prepare() formats in the caller's thread and flattens msg to a
+    string, which both defeats the point and hides structlog's event dict
+    from the ProcessorFormatter on the listener side. Records never leave
+    the process, so there's nothing to make picklable.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
 
 def setup_logging() -> None:
+    global _listener
+
     settings = get_settings()
     level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
 
@@ -35,15 +58,17 @@ def setup_logging() -> None:
     structlog.configure(
         processors=[
             *shared_processors,
+            # traceback is captured here, while exc_info is still current
             structlog.processors.format_exc_info,
-            renderer,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         wrapper_class=structlog.make_filtering_bound_logger(level),
-        logger_factory=structlog.PrintLoggerFactory(file=sys.stdout),
+        logger_factory=structlog.stdlib.LoggerFactory(),
         cache_logger_on_first_use=True,
     )
 
-    # bridge stdlib loggers through structlog so uvicorn output looks consistent
+    # one formatter for both structlog events and foreign stdlib records;
+    # it runs on the listener thread
     formatter = structlog.stdlib.ProcessorFormatter(
         foreign_pre_chain=shared_processors,
         processors=[
@@ -51,16 +76,38 @@ def setup_logging() -> None:
             renderer,
         ],
     )
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
+    sink = logging.StreamHandler(sys.stdout)
+    sink.setFormatter(formatter)
+
+    # called from both create_application and lifespan; don't leak a thread
+    if _listener is not None:
+        _listener.stop()
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, sink, respect_handler_level=True)
+    _listener.start()
 
     root = logging.getLogger()
-    root.handlers = [handler]
+    root.handlers = [_PassthroughQueueHandler(log_queue)]
     root.setLevel(level)
 
     for noisy in ("httpx", "openai", "httpcore"):
         logging.getLogger(noisy).setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """Flush whatever is still queued and stop the listener thread.
+
+    Anything logged after this writes straight to the sink again instead of
+    piling up in a queue nobody drains.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().handlers = list(_listener.handlers)
+        _listener = None
+
+
+@lru_cache(maxsize=1024)
 def get_logger(name: str | None = None) -> structlog.stdlib.BoundLogger:
+    # one proxy per name, even if something asks per request
     return structlog.get_logger(name)
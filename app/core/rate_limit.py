@@ -1,16 +1,146 @@
-"""slowapi limiter shared by main.py and any route that needs custom limits."""
+"""slowapi limiter shared by main.py and any route that needs custom limits.
+
+With REDIS_URL set, every worker shares one rolling window per client: the
+limits library keeps a capped list of hit timestamps per key and checks +
+records a hit in a single Lua script, so there's no per-process state and
+idle keys expire on their own.
+
+In front of that sits a small per-process cache so most checks never leave
+the worker: a denied key stays denied locally until its window resets, and
+an allowed key reserves a few hits from Redis at once and spends them
+locally. Both maps get one key per client, so a background task sweeps out
+entries that have expired.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import time
+from typing import Any
+
+from limits import RateLimitItem
+from limits.storage import RedisStorage
+from limits.strategies import RateLimiter
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from app.core.config import get_settings
 
+
+class _LocallyCachedStrategy:
+    """Wraps a limits strategy with an ephemeral deny / budget cache.
+
+    Reservations are real hits in the shared store, so the cross-worker
+    count stays exact; a worker just spends its reserved hits without a
+    round-trip. Anything other than hit() goes straight to the wrapped
+    strategy.
+    """
+
+    def __init__(self, inner: RateLimiter, budget: int) -> None:
+        self.inner = inner
+        self._budget = budget
+        self._deny_until: dict[str, float] = {}
+        self._local_budget: dict[str, tuple[int, float]] = {}
+
+    def hit(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        key = item.key_for(*identifiers)
+        now = time.time()
+
+        deny_until = self._deny_until.get(key)
+        if deny_until is not None:
+            if deny_until > now:
+                return False
+            del self._deny_until[key]
+
+        entry = self._local_budget.get(key)
+        if entry is not None:
+            left, expires_at = entry
+            if expires_at > now and left >= cost:
+                if left > cost:
+                    self._local_budget[key] = (left - cost, expires_at)
+                else:
+                    del self._local_budget[key]
+                return True
+            del self._local_budget[key]
+
+        reserve = min(self._budget, item.amount)
+        if reserve > cost and self.inner.hit(item, *identifiers, cost=reserve):
+            self._local_budget[key] = (reserve - cost, now + item.get_expiry())
+            return True
+        if self.inner.hit(item, *identifiers, cost=cost):
+            return True
+
+        self._deny_until[key] = self.inner.get_window_stats(item, *identifiers).reset_time
+        return False
+
+    def sweep(self, now: float | None = None) -> int:
+        """Drop expired deny / budget entries; returns how many went.
+
+        hit() only cleans up the key it's asked about, so without this a
+        client seen once stays in memory for the life of the worker.
+        """
+        now = time.time() if now is None else now
+        stale_denies = [k for k, until in self._deny_until.items() if until <= now]
+        for k in stale_denies:
+            del self._deny_until[k]
+        stale_budgets = [
+            k for k, (_, expires_at) in self._local_budget.items() if expires_at <= now
+        ]
+        for k in stale_budgets:
+            del self._local_budget[k]
+        return len(stale_denies) + len(stale_budgets)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+
+class CachedLimiter(Limiter):
+    """slowapi Limiter whose backend sits behind _LocallyCachedStrategy."""
+
+    def __init__(self, *args: Any, local_budget: int = 1, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._local_budget = local_budget
+        self._cached: _LocallyCachedStrategy | None = None
+
+    @property
+    def limiter(self) -> RateLimiter:
+        inner = super().limiter
+        # rebuild if slowapi swapped to (or back from) its in-memory fallback
+        if self._cached is None or self._cached.inner is not inner:
+            self._cached = _LocallyCachedStrategy(inner, self._local_budget)
+        return self._cached  # type: ignore[return-value]
+
+    async def sweep_local_cache(self, interval_s: float = 60.0) -> None:
+        """Sweep the per-process cache every interval_s until cancelled."""
+        while True:
+            await asyncio.sleep(interval_s)
+            if self._cached is not None:
+                self._cached.sweep()
+
+    def preload_scripts(self) -> int:
+        """SCRIPT LOAD the storage's Lua scripts; returns how many were loaded.
+
+        limits passes the rule (limit, window) as ARGV, so one SHA per script
+        covers every rule. The request path only ever issues EVALSHA; loading
+        up front just saves the first NOSCRIPT bounce per script. No-op for
+        non-Redis storage.
+        """
+        storage = self._storage
+        if not isinstance(storage, RedisStorage):
+            return 0
+        conn = storage.get_connection()
+        scripts = [v for k, v in vars(storage).items() if k.startswith("lua_")]
+        for script in scripts:
+            conn.script_load(script.script)
+        return len(scripts)
+
+
 _settings = get_settings()
 
-limiter = Limiter(
+limiter = CachedLimiter(
     key_func=get_remote_address,
     default_limits=[_settings.RATE_LIMIT],
+    strategy=_settings.RATE_LIMIT_STRATEGY,
     storage_uri=_settings.REDIS_URL or "memory://",
+    local_budget=_settings.RATE_LIMIT_LOCAL_BUDGET,
 )
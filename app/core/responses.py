@@ -0,0 +1,19 @@
+"""JSON response class backed by orjson.
+
+FastAPI ships an ORJSONResponse but has deprecated it in favour of
+response_model serialization; handlers here build plain dicts and return
+Response objects directly, so that path never applies. This is the same
+thing without the deprecation warning.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -2,18 +2,16 @@
 
 Topology:
 
-      START
-        |
-   retrieve_context     <-- prior insights / case state
-        |
-      triage
-       /|\\
-      / | \\
-sentiment event risk    <-- parallel BSP step
-      \\ | /
-       \\|/
-       decide           <-- conditional routing
-        |
+                   START
+        __________/ |  |  \\__________
+       /         /  |  |  \\          \\
+retrieve_ sentiment event triage     risk   <-- parallel BSP step; risk
+ context      |     |       \\       /          speculates on RESPOND
+     |        |     |      confirm_risk     <-- reruns risk only if triage
+      \\_______|_____|________/                   FLAGs and risk isn't High
+                    |
+                 decide            <-- join: waits for all branches
+                    |
    +----+----+----------+
 respond     skip     await_human   <-- FLAG+High pauses here via interrupt()
    |         |         |
@@ -27,6 +25,10 @@ respond \\   |         |
           \\ |         |
            v v         v
             END
+
+With CHAT_FUSED_ANALYSIS on, triage / sentiment / event / risk collapse
+into a single `analyze` node (one LM call) that runs beside
+retrieve_context; everything from decide down is unchanged.
 """
 
 from __future__ import annotations
@@ -37,23 +39,34 @@ from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import interrupt
 
+from app.core.config import get_settings
 from app.core.logging import get_logger
 from app.features.agent.state import ChatGraphState
 from app.features.chat.context import default_repo
 from app.features.chat.services import (
     CriticModule,
     EventModule,
+    FusedAnalysisModule,
     ResponseModule,
     RiskModule,
     SentimentModule,
     TriageModule,
+    triage_actions,
 )
 from app.features.chat.signatures import EventDetails
+from app.features.chat.summarization import ChatSummarizer
+from app.shared.cache import BlockingSingleFlight
 
 logger = get_logger(__name__)
 
 CRITIC_THRESHOLD = 75
 MAX_REFINE = 2
+# longest run in supersteps: the START fan-out, confirm_risk, decide, then respond +
+# critic up to MAX_REFINE + 1 times; LangGraph wants the limit strictly above
+RECURSION_LIMIT = 3 + 2 * (MAX_REFINE + 1) + 1
+# turns of history carried verbatim in graph state (and so in every
+# checkpoint); anything older is folded into one summary turn in front
+HISTORY_WINDOW = 8
 
 _triage = TriageModule()
 _risk = RiskModule()
@@ -61,17 +74,36 @@ _sentiment = SentimentModule()
 _event = EventModule()
 _respond = ResponseModule()
 _critic = CriticModule()
+_fused = FusedAnalysisModule()
+_summarizer = ChatSummarizer()
 
+# the analysis calls are deterministic in their inputs, so concurrent runs on
+# the same message ("thanks", "ok") share one LM call instead of racing
+_calls: BlockingSingleFlight[tuple[str, ...], Any] = BlockingSingleFlight()
 
-def _actions(triage: dict[str, Any]) -> list[str]:
-    out = []
-    if triage["should_flag"]:
-        out.append("FLAG")
-    if triage["should_respond"]:
-        out.append("RESPOND")
-    if triage["should_ignore"]:
-        out.append("IGNORE")
-    return out
+
+async def condense_history(
+    history: list[dict[str, Any]], window: int = HISTORY_WINDOW
+) -> list[dict[str, Any]]:
+    """The last `window` turns, led by one system turn summarizing the rest.
+
+    Keeps graph state (and every checkpoint) the same size however long the
+    conversation runs. The summarizer remembers what it has summarized, so
+    a conversation that grew by a turn costs one small extend call. If the
+    summary fails, the turns before the window are just dropped.
+    """
+    if len(history) <= window:
+        return history
+    earlier = [
+        {"sender": m.get("sender", "unknown"), "text": m.get("content") or m.get("text", "")}
+        for m in history[:-window]
+    ]
+    try:
+        summary = await _summarizer.summarize_chat({"messages": earlier})
+    except Exception as e:
+        logger.warning("history_summary_failed", turns=len(earlier), error=str(e))
+        return history[-window:]
+    return [{"role": "system", "content": f"Prior context: {summary}"}, *history[-window:]]
 
 
 async def retrieve_context_node(state: ChatGraphState) -> dict[str, Any]:
@@ -87,43 +119,100 @@ async def retrieve_context_node(state: ChatGraphState) -> dict[str, Any]:
     }
 
 
-def triage_node(state: ChatGraphState) -> dict[str, Any]:
-    out = _triage(state["message"])
+# prediction -> state slice; shared by the per-task nodes and analyze_node
+
+
+def _triage_of(out: Any) -> dict[str, Any]:
     return {
-        "triage": {
-            "should_flag": out.should_flag,
-            "should_respond": out.should_respond,
-            "should_ignore": out.should_ignore,
-            "reasoning": out.reasoning,
-        }
+        "should_flag": out.should_flag,
+        "should_respond": out.should_respond,
+        "should_ignore": out.should_ignore,
+        "reasoning": out.reasoning,
     }
 
 
-def sentiment_node(state: ChatGraphState) -> dict[str, Any]:
-    out = _sentiment(state["message"])
-    return {"sentiment": {"sentiment": out.sentiment, "sentiment_score": out.sentiment_score}}
+def _sentiment_of(out: Any) -> dict[str, Any]:
+    return {"sentiment": out.sentiment, "sentiment_score": out.sentiment_score}
 
 
-def event_node(state: ChatGraphState) -> dict[str, Any]:
-    out = _event(state["message"])
+def _event_of(out: Any) -> dict[str, Any]:
     details = out.event_details
     if isinstance(details, EventDetails):
         details = details.model_dump()
     return {
-        "event": {
-            "has_event": bool(out.has_event),
-            "event_details": details,
-            "suggested_reminder": out.suggested_reminder,
-            "internal_note": out.internal_note,
-        }
+        "has_event": bool(out.has_event),
+        "event_details": details,
+        "suggested_reminder": out.suggested_reminder,
+        "internal_note": out.internal_note,
     }
 
 
+def _risk_of(out: Any) -> dict[str, Any]:
+    return {"risk_update": out.risk_update, "risk_score": out.risk_score}
+
+
+def triage_node(state: ChatGraphState) -> dict[str, Any]:
+    message = state["message"]
+    return {"triage": _triage_of(_calls.run(("triage", message), lambda: _triage(message)))}
+
+
+# sentiment and event don't steer routing, so a failure in either falls back
+# to a neutral value instead of failing the run; triage / risk still raise
+_SENTIMENT_FALLBACK = {"sentiment": "Neutral", "sentiment_score": 50}
+_EVENT_FALLBACK = {"has_event": False, "event_details": None, "suggested_reminder": None, "internal_note": None}
+
+
+def sentiment_node(state: ChatGraphState) -> dict[str, Any]:
+    try:
+        message = state["message"]
+        return {"sentiment": _sentiment_of(_calls.run(("sentiment", message), lambda: _sentiment(message)))}
+    except Exception as e:
+        logger.warning("analysis_branch_failed", branch="sentiment", error=str(e))
+        return {"sentiment": dict(_SENTIMENT_FALLBACK)}
+
+
+def event_node(state: ChatGraphState) -> dict[str, Any]:
+    try:
+        message = state["message"]
+        return {"event": _event_of(_calls.run(("event", message), lambda: _event(message)))}
+    except Exception as e:
+        logger.warning("analysis_branch_failed", branch="event", error=str(e))
+        return {"event": dict(_EVENT_FALLBACK)}
+
+
+# risk starts alongside triage assuming the common outcome; confirm_risk
+# redoes it only when the real triage would plausibly change the answer
+_SPECULATED_ACTIONS = ["RESPOND"]
+
+
+def _run_risk(message: str, triage_actions: str) -> Any:
+    return _calls.run(("risk", message, triage_actions), lambda: _risk(message, triage_actions))
+
+
 def risk_node(state: ChatGraphState) -> dict[str, Any]:
-    triage = state["triage"]
-    actions = ", ".join(_actions(triage)) or "NONE"
-    out = _risk(state["message"], actions)
-    return {"risk": {"risk_update": out.risk_update, "risk_score": out.risk_score}}
+    return {"risk": _risk_of(_run_risk(state["message"], ", ".join(_SPECULATED_ACTIONS)))}
+
+
+def confirm_risk_node(state: ChatGraphState) -> dict[str, Any]:
+    actions = triage_actions(state["triage"])
+    # a FLAG pushes risk to at least Medium, and High already can't go higher;
+    # IGNORE / RESPOND mixes don't move the band, so keep the guess for those
+    rerun = "FLAG" in actions and state["risk"]["risk_update"] != "High"
+    logger.info("risk_speculation", hit=not rerun, actions=actions)
+    if not rerun:
+        return {}
+    return {"risk": _risk_of(_run_risk(state["message"], ", ".join(actions)))}
+
+
+def analyze_node(state: ChatGraphState) -> dict[str, Any]:
+    message = state["message"]
+    out = _calls.run(("fused", message), lambda: _fused(message))
+    return {
+        "triage": _triage_of(out),
+        "sentiment": _sentiment_of(out),
+        "event": _event_of(out),
+        "risk": _risk_of(out),
+    }
 
 
 def decide_node(state: ChatGraphState) -> dict[str, Any]:
@@ -220,31 +309,49 @@ def skip_node(state: ChatGraphState) -> dict[str, Any]:
     return {"reply": None}
 
 
-def build_chat_graph(checkpointer=None):
+def graph_config(thread_id: str) -> dict[str, Any]:
+    """Run config for chat_graph: the checkpoint thread plus a step cap that
+    fits this topology instead of LangGraph's generic default of 25.
+    """
+    return {"configurable": {"thread_id": thread_id}, "recursion_limit": RECURSION_LIMIT}
+
+
+def build_chat_graph(checkpointer=None, fused: bool | None = None):
     """Compile the graph. Defaults to a process-local MemorySaver — fine for
     single-instance dev. In prod, pass an AsyncSqliteSaver or a Postgres
     checkpointer so HITL pauses survive restarts and load-balanced replicas.
+
+    fused (default: CHAT_FUSED_ANALYSIS) swaps the four analysis nodes for
+    one analyze node backed by a single LM call.
     """
+    if fused is None:
+        fused = get_settings().CHAT_FUSED_ANALYSIS
+
     g = StateGraph(ChatGraphState)
     g.add_node("retrieve_context", retrieve_context_node)
-    g.add_node("triage", triage_node)
-    g.add_node("sentiment", sentiment_node)
-    g.add_node("event", event_node)
-    g.add_node("risk", risk_node)
     g.add_node("decide", decide_node)
     g.add_node("respond", respond_node)
     g.add_node("critic", critic_node)
     g.add_node("await_human", await_human_node)
     g.add_node("skip", skip_node)
 
-    g.add_edge(START, "retrieve_context")
-    g.add_edge("retrieve_context", "triage")
-    g.add_edge("triage", "sentiment")
-    g.add_edge("triage", "event")
-    g.add_edge("triage", "risk")
-    g.add_edge("sentiment", "decide")
-    g.add_edge("event", "decide")
-    g.add_edge("risk", "decide")
+    if fused:
+        g.add_node("analyze", analyze_node)
+        g.add_edge(START, "retrieve_context")
+        g.add_edge(START, "analyze")
+        g.add_edge(["retrieve_context", "analyze"], "decide")
+    else:
+        g.add_node("triage", triage_node)
+        g.add_node("sentiment", sentiment_node)
+        g.add_node("event", event_node)
+        g.add_node("risk", risk_node)
+        g.add_node("confirm_risk", confirm_risk_node)
+        # every analysis starts right away; risk speculates on triage's outcome
+        for node in ("retrieve_context", "triage", "sentiment", "event", "risk"):
+            g.add_edge(START, node)
+        g.add_edge(["triage", "risk"], "confirm_risk")
+        # join edge: decide runs once, after the slowest branch lands
+        g.add_edge(["retrieve_context", "sentiment", "event", "confirm_risk"], "decide")
 
     g.add_conditional_edges(
         "decide",
@@ -6,18 +6,18 @@
 
 from __future__ import annotations
 
-import json
 import uuid
 from collections.abc import AsyncIterator
 from typing import Any
 
+import orjson
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from langgraph.types import Command
 from pydantic import BaseModel, Field
 
 from app.core.logging import get_logger
-from app.features.agent.chat_graph import chat_graph
+from app.features.agent.chat_graph import chat_graph, condense_history, graph_config
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -45,11 +45,13 @@ def _thread_id_for(req: StreamRequest) -> str:
 
 
 def _sse(payload: dict[str, Any]) -> bytes:
-    return f"data: {json.dumps(payload, default=str)}\n\n".encode()
+    # orjson writes bytes directly; dataclasses (e.g. Interrupt) serialize
+    # natively, anything else unknown falls back to str() as before
+    return b"data: " + orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
 
 
 async def _stream_graph(input_value: Any, thread_id: str) -> AsyncIterator[bytes]:
-    config = {"configurable": {"thread_id": thread_id}}
+    config = graph_config(thread_id)
     yield _sse({"event": "start", "thread_id": thread_id})
     try:
         async for chunk in chat_graph.astream(input_value, config=config, stream_mode="updates"):
@@ -72,7 +74,7 @@ async def stream_chat_analysis(request: StreamRequest):
     thread_id = _thread_id_for(request)
     payload = {
         "message": request.message,
-        "history": request.history,
+        "history": await condense_history(request.history),
         "client_info": request.client_info,
     }
     return StreamingResponse(_stream_graph(payload, thread_id), media_type="text/event-stream")
@@ -8,7 +8,7 @@ from typing import Any, TypedDict
 class ChatGraphState(TypedDict, total=False):
     # inputs
     message: str
-    history: list[dict[str, Any]]
+    history: list[dict[str, Any]]  # summary turn + last HISTORY_WINDOW turns
     client_info: dict[str, Any]
 
     # context fetched at the start of the run
@@ -2,68 +2,126 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+import asyncio
+from functools import lru_cache
+from typing import Annotated
 
-from app.core.exceptions import ValidationError
+import orjson
+from fastapi import APIRouter, Depends, Request
+
+from app.core.config import get_settings
 from app.core.logging import get_logger
-from app.features.chat.services import ChatOrchestrator
+from app.features.chat.services import AnalysisResult, ChatOrchestrator
 from app.features.chat.summarization import ChatSummarizer
 from app.features.chat.text_processing import TextProcessor
-from app.shared.http import ok
+from app.features.chat.text_processing import cache_stats as text_cache_stats
+from app.shared.cache import LRUCache, SingleFlight
+from app.shared.events import EventBatcher
+from app.shared.http import JsonBody, etag_for, not_modified, ok, rejected
 from app.shared.schemas import (
     ChatSummarizationRequest,
     ChatSummarizationResult,
     ConciseRequest,
     ConciseResult,
+    ConversationBatch,
     ConversationHistory,
     MessageAnalysisResult,
 )
 from app.shared.utils import (
     extract_client_context,
+    sanitize_recent,
     sanitize_text,
-    truncate_conversation_history,
 )
 
 logger = get_logger(__name__)
 router = APIRouter()
 
+_analysis_log = EventBatcher("analysis_logged")
+_conversation_body = JsonBody(ConversationHistory)
+
+# past this many messages a cold (uncached) history is sanitized on a worker
+# thread so one huge payload doesn't stall every other request on the loop
+_OFFLOAD_MESSAGES = 200
+
 
+# one instance per process, built on first request; none hold per-request state
+@lru_cache(maxsize=1)
 def get_orchestrator() -> ChatOrchestrator:
     return ChatOrchestrator()
 
 
+@lru_cache(maxsize=1)
 def get_summarizer() -> ChatSummarizer:
     return ChatSummarizer()
 
 
+@lru_cache(maxsize=1)
 def get_text_processor() -> TextProcessor:
     return TextProcessor()
 
 
-def _clean_messages(messages) -> list[dict]:
-    out = []
-    for m in messages:
-        content = sanitize_text(m.content)
-        if content:
-            out.append({"sender": m.sender, "content": content, "timestamp": m.timestamp})
-    return out
+# (client_id, hash of the raw history) -> that history, sanitized. A follow-up
+# turn usually resends the same history plus one message, so it finds its
+# prefix here and only cleans the tail.
+_prefix_cache: LRUCache[tuple[str, int], list[dict]] = LRUCache(maxsize=1024, ttl_s=900)
+# same key: a double-click or client retry while the first run is still going
+# waits for that run instead of paying for a second one
+_analyze_inflight: SingleFlight[tuple[str, int], AnalysisResult] = SingleFlight()
+
+
+def _clean_messages(messages, key: str = "content", limit: int | None = None) -> list[dict]:
+    return [
+        {"sender": messages[i].sender, key: c, "timestamp": messages[i].timestamp}
+        for i, c in sanitize_recent([m.content for m in messages], limit)
+    ]
 
 
-@router.post("/analyze", response_model=MessageAnalysisResult)
+async def _clean_history(client_id: str, messages) -> tuple[list[dict], tuple[str, int]]:
+    """Sanitized history, cut to MAX_CONVERSATION_HISTORY, plus its
+    (client_id, hash) key.
+    """
+    limit = get_settings().MAX_CONVERSATION_HISTORY
+    sig = tuple((m.sender, m.timestamp, m.content) for m in messages)
+    prefix = _prefix_cache.get((client_id, hash(sig[:-1])))
+    if prefix is None and len(messages) > _OFFLOAD_MESSAGES:
+        # _clean_messages is pure; the caches are only touched back on the loop
+        cleaned = await asyncio.to_thread(_clean_messages, messages, limit=limit)
+    elif prefix is None:
+        cleaned = _clean_messages(messages, limit=limit)
+    else:
+        # treat cached entries as read-only; build a new list around them
+        cleaned = (prefix + _clean_messages(messages[-1:]))[-limit:]
+    key = (client_id, hash(sig))
+    _prefix_cache.set(key, cleaned)
+    return cleaned, key
+
+
+@router.post(
+    "/analyze", response_model=MessageAnalysisResult, openapi_extra=_conversation_body.openapi
+)
 async def analyze_message(
-    conversation: ConversationHistory,
-    background_tasks: BackgroundTasks,
-    orchestrator: ChatOrchestrator = Depends(get_orchestrator),
+    request: Request,
+    conversation: Annotated[ConversationHistory, Depends(_conversation_body)],
+    orchestrator: Annotated[ChatOrchestrator, Depends(get_orchestrator)],
 ):
     if not conversation.messages:
-        raise ValidationError("messages list cannot be empty")
+        return rejected("messages list cannot be empty")
 
-    cleaned = _clean_messages(conversation.messages)
-    if not cleaned:
-        raise ValidationError("no valid messages after sanitization")
+    truncated, history_key = await _clean_history(
+        conversation.client_info.client_id, conversation.messages
+    )
+    if not truncated:
+        return rejected("no valid messages after sanitization")
 
-    truncated = truncate_conversation_history(cleaned)
-    ctx = extract_client_context(conversation.client_info.model_dump(), truncated)
+    # clients poll while the user types; an unchanged request needs no rerun.
+    # The tag covers everything the analysis reads: the whole cleaned history
+    # and the client info. (history_key won't do: hash() differs per worker.)
+    etag = etag_for(conversation.client_info.model_dump_json(), orjson.dumps(truncated))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    client_info = conversation.client_info.model_dump()
+    ctx = extract_client_context(client_info, truncated)
 
     logger.info(
         "analyze_message_start",
@@ -71,17 +129,55 @@ async def analyze_message(
         n=len(truncated),
     )
 
-    result = await orchestrator.analyze_message(
-        client_info=conversation.client_info.model_dump(),
-        conversation_history=truncated,
+    result = await _analyze_inflight.run(
+        history_key,
+        lambda: orchestrator.analyze_message(
+            client_info=client_info,
+            conversation_history=truncated,
+        ),
     )
 
-    background_tasks.add_task(
-        _log_analysis,
-        client_id=conversation.client_info.client_id,
-        analysis=result,
+    _log_analysis(conversation.client_info.client_id, result)
+    resp = ok(result, processed_messages=len(truncated), client_context=ctx)
+    resp.headers["ETag"] = etag
+    return resp
+
+
+@router.post("/analyze-batch")
+async def analyze_batch(
+    batch: ConversationBatch,
+    orchestrator: Annotated[ChatOrchestrator, Depends(get_orchestrator)],
+):
+    """Analyze several conversations concurrently; one result per input, in order.
+
+    Conversations that fail validation or analysis get {"error": ...} in
+    their slot rather than failing the batch.
+    """
+    cleaned = await asyncio.gather(
+        *(_clean_history(c.client_info.client_id, c.messages) for c in batch.conversations)
+    )
+    runnable = [i for i, (history, _) in enumerate(cleaned) if history]
+    outcomes = await orchestrator.analyze_batch(
+        [batch.conversations[i].client_info.model_dump() for i in runnable],
+        [cleaned[i][0] for i in runnable],
+    )
+
+    results: list[dict] = [{"error": "no valid messages after sanitization"} for _ in cleaned]
+    for i, outcome in zip(runnable, outcomes, strict=True):
+        if isinstance(outcome, Exception):
+            logger.warning("analyze_batch_item_failed", index=i, error=str(outcome))
+            # ValueError is the orchestrator's "bad input"; hide anything else
+            results[i] = {
+                "error": str(outcome) if isinstance(outcome, ValueError) else "analysis failed"
+            }
+        else:
+            _log_analysis(batch.conversations[i].client_info.client_id, outcome)
+            results[i] = outcome
+    return ok(
+        {"results": results},
+        processed_conversations=len(runnable),
+        failed_conversations=sum("error" in r for r in results),
     )
-    return ok(result, processed_messages=len(truncated), client_context=ctx)
 
 
 @router.post("/summarize", response_model=ChatSummarizationResult)
@@ -90,15 +186,11 @@ async def summarize_conversation(
     summarizer: ChatSummarizer = Depends(get_summarizer),
 ):
     if not request.messages:
-        raise ValidationError("messages list cannot be empty")
+        return rejected("messages list cannot be empty")
 
-    messages = [
-        {"sender": m.sender, "text": sanitize_text(m.content), "timestamp": m.timestamp}
-        for m in request.messages
-        if sanitize_text(m.content)
-    ]
+    messages = _clean_messages(request.messages, key="text")
     if not messages:
-        raise ValidationError("no valid messages after sanitization")
+        return rejected("no valid messages after sanitization")
 
     summary = await summarizer.summarize_chat({"messages": messages})
     return ok({"summary": summary}, processed_messages=len(messages))
@@ -111,27 +203,31 @@ async def make_text_concise(
 ):
     text = sanitize_text(request.text)
     if not text:
-        raise ValidationError("text cannot be empty")
+        return rejected("text cannot be empty")
 
     concise = await processor.make_concise(text)
+    original_length, concise_length = len(text), len(concise)
     return ok(
         {"concise_text": concise},
-        original_length=len(text),
-        concise_length=len(concise),
+        original_length=original_length,
+        concise_length=concise_length,
+        # text is non-empty here, so no zero guard needed
+        reduction_ratio=round((original_length - concise_length) * 100 / original_length, 2),
     )
 
 
 @router.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "chat_analysis"}
+    return {"status": "healthy", "service": "chat_analysis", "text_cache": text_cache_stats()}
 
 
-async def _log_analysis(client_id: str, analysis: dict) -> None:
-    logger.info(
-        "analysis_logged",
+def _log_analysis(client_id: str, analysis: AnalysisResult) -> None:
+    # runs inline now, so stay lenient: a log line must never fail the request
+    event = analysis.get("event_detection")
+    _analysis_log.emit(
         client_id=client_id,
         actions=analysis.get("actions"),
         risk=analysis.get("risk_update"),
         sentiment=analysis.get("sentiment"),
-        has_event=analysis.get("event_detection", {}).get("has_event", False),
+        has_event=event.get("has_event", False) if event else False,
     )
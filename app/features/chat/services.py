@@ -8,24 +8,32 @@ dict the API returns.
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from typing import Any, TypedDict
 
 import dspy
 
+from app.core.config import get_settings
 from app.core.llm import get_lm
 from app.core.logging import get_logger
 from app.features.chat.signatures import (
     CritiqueReply,
     EventDetect,
     EventDetails,
+    FusedAnalysis,
     GenerateResponse,
     Risk,
     Sentiment,
     Triage,
+    TriageBatch,
+    TriageDecision,
 )
 
 logger = get_logger(__name__)
 
+# Each Predict carries an output budget (max_tokens) sized to its signature's
+# JSON, well under LM_MAX_TOKENS, so a runaway generation is cut short.
+
 
 def _validate_triage(decision: Any) -> None:
     if decision.should_respond and decision.should_ignore:
@@ -37,7 +45,7 @@ def _validate_triage(decision: Any) -> None:
 class TriageModule(dspy.Module):
     def __init__(self) -> None:
         super().__init__()
-        self.predict = dspy.Predict(Triage)
+        self.predict = dspy.Predict(Triage, max_tokens=150)
 
     def forward(self, message: str):
         out = self.predict(message=message)
@@ -45,10 +53,46 @@ class TriageModule(dspy.Module):
         return out
 
 
+class BatchTriageModule(dspy.Module):
+    """Triage for many messages, up to batch_size per LM call.
+
+    For offline work (backfills, re-analysis) where round-trips matter more
+    than latency. A chunk whose call fails, or whose answer doesn't line up
+    with its inputs or doesn't validate, is redone message by message, so
+    callers always get one decision each and finished chunks are kept.
+    """
+
+    def __init__(self, batch_size: int = 20) -> None:
+        super().__init__()
+        self.batch_size = batch_size
+        self.predict = dspy.Predict(TriageBatch, max_tokens=100 * batch_size)
+        self.single = TriageModule()
+
+    def forward(self, messages: list[str]) -> list[TriageDecision]:
+        decisions: list[TriageDecision] = []
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start : start + self.batch_size]
+            try:
+                out = self._chunk(chunk)
+            except Exception as e:
+                logger.warning("triage_batch_failed", size=len(chunk), error=str(e))
+                out = [TriageDecision(**self.single(message=m).toDict()) for m in chunk]
+            decisions.extend(out)
+        return decisions
+
+    def _chunk(self, chunk: list[str]) -> list[TriageDecision]:
+        out = self.predict(messages=chunk).decisions
+        if len(out) != len(chunk):
+            raise ValueError(f"expected {len(chunk)} decisions, got {len(out)}")
+        for decision in out:
+            _validate_triage(decision)
+        return out
+
+
 class RiskModule(dspy.Module):
     def __init__(self) -> None:
         super().__init__()
-        self.predict = dspy.Predict(Risk)
+        self.predict = dspy.Predict(Risk, max_tokens=60)
 
     def forward(self, message: str, triage_actions: str):
         out = self.predict(message=message, triage_actions=triage_actions)
@@ -59,10 +103,12 @@ class RiskModule(dspy.Module):
 class SentimentModule(dspy.Module):
     def __init__(self) -> None:
         super().__init__()
-        self.predict = dspy.Predict(Sentiment)
+        self.predict = dspy.Predict(Sentiment, max_tokens=60)
 
     def forward(self, message: str):
-        out = self.predict(message=message)
+        # a band + score is well within the fast tier
+        with dspy.context(lm=get_lm("fast")):
+            out = self.predict(message=message)
         out.sentiment_score = max(0, min(100, int(out.sentiment_score)))
         return out
 
@@ -70,10 +116,30 @@ class SentimentModule(dspy.Module):
 class EventModule(dspy.Module):
     def __init__(self) -> None:
         super().__init__()
-        self.predict = dspy.Predict(EventDetect)
+        self.predict = dspy.Predict(EventDetect, max_tokens=400)
 
     def forward(self, message: str):
-        return self.predict(message=message)
+        with dspy.context(lm=get_lm("fast")):
+            return self.predict(message=message)
+
+
+class FusedAnalysisModule(dspy.Module):
+    """Triage + risk + sentiment + event in a single LM call.
+
+    Same post-processing as the separate modules, so the output can stand in
+    for all four. Used by chat_graph when CHAT_FUSED_ANALYSIS is on.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.predict = dspy.Predict(FusedAnalysis, max_tokens=600)
+
+    def forward(self, message: str):
+        out = self.predict(message=message)
+        _validate_triage(out)
+        out.risk_score = max(0, min(100, int(out.risk_score)))
+        out.sentiment_score = max(0, min(100, int(out.sentiment_score)))
+        return out
 
 
 class ResponseModule(dspy.Module):
@@ -81,17 +147,10 @@ class ResponseModule(dspy.Module):
 
     def __init__(self) -> None:
         super().__init__()
-        base = get_lm("main")
-        self._lm_warm = dspy.LM(
-            model=base.model,
-            api_key=base.kwargs.get("api_key"),
-            temperature=0.7,
-            max_tokens=512,
-        )
         self.predict = dspy.Predict(GenerateResponse)
 
     def forward(self, *, critic_notes: str = "", **kwargs):
-        with dspy.context(lm=self._lm_warm):
+        with dspy.context(lm=get_lm("main", temperature=0.7, max_tokens=300)):
             out = self.predict(critic_notes=critic_notes, **kwargs)
         return out.reply.strip().strip('"').strip("'")
 
@@ -101,12 +160,11 @@ class CriticModule(dspy.Module):
 
     def __init__(self) -> None:
         super().__init__()
-        # use the fast tier — critic doesn't need the main model
-        self._lm = get_lm("fast")
-        self.predict = dspy.Predict(CritiqueReply)
+        self.predict = dspy.Predict(CritiqueReply, max_tokens=200)
 
     def forward(self, *, client_message: str, sentiment: str, is_flagged: bool, draft_reply: str):
-        with dspy.context(lm=self._lm):
+        # use the fast tier — critic doesn't need the main model
+        with dspy.context(lm=get_lm("fast")):
             out = self.predict(
                 client_message=client_message,
                 sentiment=sentiment,
@@ -117,61 +175,150 @@ class CriticModule(dspy.Module):
         return out
 
 
+# triage flag -> action label, in the order the API reports them
+_ACTION_FLAGS = (
+    ("should_flag", "FLAG"),
+    ("should_respond", "RESPOND"),
+    ("should_ignore", "IGNORE"),
+)
+
+
+def triage_actions(triage: dict[str, Any]) -> list[str]:
+    return [label for flag, label in _ACTION_FLAGS if triage[flag]]
+
+
+class EventPayload(TypedDict):
+    has_event: bool
+    event_details: dict[str, Any] | None
+    suggested_reminder: str | None
+    internal_note: str | None
+
+
+class AnalysisResult(TypedDict, total=False):
+    """What analyze_message returns; every key but the last two is always set
+    by _shape, and the orchestrator adds thread_id / awaiting_human.
+    """
+
+    actions: list[str]
+    triage_reasoning: str
+    risk_update: str
+    risk_score: int
+    sentiment: str
+    sentiment_score: int
+    response_to_send: str | None
+    event_detection: EventPayload
+    full_analysis: dict[str, Any]
+    thread_id: str
+    awaiting_human: bool
+
+
+def _thread_for(client_info: dict[str, Any]) -> str:
+    # Same client => same thread => the graph remembers prior state
+    # (refine_count, partial branch outputs, paused await_human, ...).
+    return str(client_info.get("client_id") or "anonymous")
+
+
 class ChatOrchestrator:
     """Drives the chat-analysis LangGraph and shapes the result for the API."""
 
     def __init__(self) -> None:
         # imported here to avoid an import cycle: chat_graph imports the modules above
-        from app.features.agent.chat_graph import chat_graph
+        from app.features.agent.chat_graph import chat_graph, condense_history, graph_config
         self._graph = chat_graph
+        self._config = graph_config
+        self._condense = condense_history
+        # caps graph runs (and so LM fan-out) per worker; excess callers wait
+        self._inflight = asyncio.Semaphore(get_settings().CHAT_MAX_INFLIGHT)
+        self._batch_triage = BatchTriageModule()
 
     async def analyze_message(
         self,
         client_info: dict[str, Any],
         conversation_history: list[dict[str, Any]],
         thread_id: str | None = None,
-    ) -> dict[str, Any]:
+    ) -> AnalysisResult:
         if not conversation_history:
             raise ValueError("conversation history is empty")
         current = conversation_history[-1].get("content", "")
         if not current:
             raise ValueError("current message is empty")
 
-        # Same client => same thread => the graph remembers prior state
-        # (refine_count, partial branch outputs, paused await_human, ...).
-        thread = thread_id or str(client_info.get("client_id") or "anonymous")
-        config = {"configurable": {"thread_id": thread}}
-
-        final = await self._graph.ainvoke(
-            {
-                "message": current,
-                "history": conversation_history,
-                "client_info": client_info,
-            },
-            config=config,
-        )
+        thread = thread_id or _thread_for(client_info)
+        config = self._config(thread)
+
+        history = await self._condense(conversation_history)
+        async with self._inflight:
+            final = await self._graph.ainvoke(
+                {
+                    "message": current,
+                    "history": history,
+                    "client_info": client_info,
+                },
+                config=config,
+            )
         shaped = _shape(final, client_info)
         # surface the thread + whether the graph paused for a human
         shaped["thread_id"] = thread
         shaped["awaiting_human"] = bool(final.get("__interrupt__"))
         return shaped
 
+    async def analyze_batch(
+        self,
+        client_infos: list[dict[str, Any]],
+        histories: list[list[dict[str, Any]]],
+        concurrency: int = 8,
+    ) -> list[AnalysisResult | Exception]:
+        """analyze_message over many conversations, at most `concurrency` graph
+        runs at a time. Results keep input order; a failed conversation comes
+        back as its exception instead of sinking the whole batch.
+
+        Conversations for the same client share its graph thread, and so its
+        checkpoint; those run one after another, as separate /analyze calls
+        would, while different clients run side by side.
+        """
+        if len(client_infos) != len(histories):
+            raise ValueError("client_infos and histories differ in length")
+        sem = asyncio.Semaphore(concurrency)
+        results: list[AnalysisResult | Exception | None] = [None] * len(histories)
+        threads: dict[str, list[int]] = {}
+        for i, client_info in enumerate(client_infos):
+            threads.setdefault(_thread_for(client_info), []).append(i)
+
+        async def run_thread(indices: list[int]) -> None:
+            for i in indices:
+                try:
+                    async with sem:
+                        results[i] = await self.analyze_message(client_infos[i], histories[i])
+                except Exception as e:
+                    results[i] = e
+
+        await asyncio.gather(*(run_thread(indices) for indices in threads.values()))
+        return results  # type: ignore[return-value]
+
+    async def triage_batch(self, messages: list[str]) -> list[dict[str, Any]]:
+        """Triage only, for many messages at once and off the graph: no
+        thread state, no replies. Meant for bulk / offline callers.
+        """
+        if not messages:
+            return []
+        decisions = await asyncio.to_thread(self._batch_triage, messages=messages)
+        return [
+            {
+                "actions": triage_actions(d.model_dump()),
+                "triage_reasoning": d.reasoning,
+            }
+            for d in decisions
+        ]
 
-def _shape(state: dict[str, Any], client_info: dict[str, Any]) -> dict[str, Any]:
+
+def _shape(state: dict[str, Any], client_info: dict[str, Any]) -> AnalysisResult:
     triage = state["triage"]
     risk = state["risk"]
     sentiment = state["sentiment"]
     event = state["event"]
     reply = state.get("reply")
 
-    actions: list[str] = []
-    if triage["should_flag"]:
-        actions.append("FLAG")
-    if triage["should_respond"]:
-        actions.append("RESPOND")
-    if triage["should_ignore"]:
-        actions.append("IGNORE")
-
+    actions = triage_actions(triage)
     event_payload = _coerce_event_details(event)
 
     logger.info(
@@ -203,7 +350,7 @@ def _shape(state: dict[str, Any], client_info: dict[str, Any]) -> dict[str, Any]
     }
 
 
-def _coerce_event_details(event: dict[str, Any]) -> dict[str, Any]:
+def _coerce_event_details(event: dict[str, Any]) -> EventPayload:
     details = event.get("event_details")
     if isinstance(details, EventDetails):
         details = details.model_dump()
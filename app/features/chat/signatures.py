@@ -42,6 +42,30 @@ class Triage(dspy.Signature):
     reasoning: str = dspy.OutputField(desc="One sentence on why")
 
 
+class TriageDecision(BaseModel):
+    should_flag: bool
+    should_respond: bool
+    should_ignore: bool
+    reasoning: str
+
+
+class TriageBatch(dspy.Signature):
+    """Triage several independent client messages for a law firm, one
+    decision per message, in the same order.
+
+    Judge each message on its own with the same rules as single triage:
+    should_respond and should_ignore are mutually exclusive, should_flag
+    may combine with either, at least one must be true. Flag for
+    legal/medical advice questions, extreme distress, new injuries, threats
+    to leave, requests to speak with a person. Ignore only content-free
+    closers ("ok", "thanks"). Respond when an immediate auto-reply helps.
+    """
+
+    messages: list[str] = dspy.InputField(desc="Unrelated client messages")
+
+    decisions: list[TriageDecision] = dspy.OutputField(desc="Exactly one per message, same order")
+
+
 class Risk(dspy.Signature):
     """Assess client retention risk from the message and triage outcome.
 
@@ -85,6 +109,46 @@ class EventDetect(dspy.Signature):
     internal_note: str | None = dspy.OutputField()
 
 
+class FusedAnalysis(dspy.Signature):
+    """Analyze a client message for a law firm in one pass: triage, risk,
+    sentiment and event detection. Apply the same rules as the separate
+    passes.
+
+    Triage: should_respond and should_ignore are mutually exclusive,
+    should_flag may combine with either, at least one must be true. Flag for
+    legal/medical advice questions, extreme distress, new injuries, threats
+    to leave, requests to speak with a person. Ignore only content-free
+    closers ("ok", "thanks"). Respond when an immediate auto-reply helps.
+
+    Risk (retention), taking your own triage decision into account:
+    High 70-100 (threats to leave, malpractice accusations, frantic urgency,
+    financial-aid requests, suicidal ideation); Medium 40-69 (frustration,
+    vague dissatisfaction, or flagged but not High); Low 0-39.
+
+    Sentiment: Positive 0-30, Neutral 31-60, Negative 61-100; the score
+    tracks intensity within its band.
+
+    Events: if a future event or appointment is mentioned, extract details
+    and draft a short reminder + internal note; otherwise has_event=false
+    and leave the rest empty.
+    """
+
+    message: str = dspy.InputField(desc="The client's most recent message")
+
+    should_flag: bool = dspy.OutputField(desc="Needs human attention")
+    should_respond: bool = dspy.OutputField(desc="Send an automated reply")
+    should_ignore: bool = dspy.OutputField(desc="Conversation closer with no new info")
+    reasoning: str = dspy.OutputField(desc="One sentence on the triage decision")
+    risk_update: Literal["Low", "Medium", "High"] = dspy.OutputField()
+    risk_score: int = dspy.OutputField(desc="0-100 inside the band for risk_update")
+    sentiment: Literal["Positive", "Neutral", "Negative"] = dspy.OutputField()
+    sentiment_score: int = dspy.OutputField(desc="0-100, see band rules")
+    has_event: bool = dspy.OutputField()
+    event_details: EventDetails | None = dspy.OutputField()
+    suggested_reminder: str | None = dspy.OutputField()
+    internal_note: str | None = dspy.OutputField()
+
+
 class GenerateResponse(dspy.Signature):
     """Write one short, human-sounding reply that matches the client's tone.
 
@@ -1,14 +1,22 @@
-"""Chat summarization via DSPy. Cheap-tier LM, deterministic temperature."""
+"""Chat summarization via DSPy. Cheap-tier LM, deterministic temperature.
+
+Summaries are remembered by a digest of the chat log. A chat we've seen
+before comes straight from memory; a chat that only grew since a summary we
+remember gets that summary extended with the new lines, so a long-running
+conversation costs one small call per new turn rather than a full re-read.
+"""
 
 from __future__ import annotations
 
 import asyncio
+import hashlib
 from typing import Any
 
 import dspy
 
 from app.core.llm import get_lm
 from app.core.logging import get_logger
+from app.shared.cache import LRUCache
 
 logger = get_logger(__name__)
 
@@ -26,22 +34,72 @@ class _Summarize(dspy.Signature):
     summary: str = dspy.OutputField()
 
 
+class _ExtendSummary(dspy.Signature):
+    """Update a chat summary with messages that came after it.
+
+    Keep the exact format of the previous summary and its quote of the
+    first message. Refresh the latest point discussed, the client's overall
+    tone, and the key-topic count to cover the new messages too.
+    """
+
+    previous_summary: str = dspy.InputField()
+    new_lines: str = dspy.InputField(desc="One '<sender>: <text>' per line")
+    summary: str = dspy.OutputField()
+
+
+def _prefix_digests(lines: list[str]) -> list[bytes]:
+    """digests[i] identifies lines[: i + 1]; one pass, each line hashed once."""
+    h = hashlib.blake2b(digest_size=16)
+    digests = []
+    for line in lines:
+        h.update(line.encode())
+        h.update(b"\n")
+        digests.append(h.copy().digest())
+    return digests
+
+
 class ChatSummarizer:
     def __init__(self) -> None:
         self._lm = get_lm("summary")
-        self._predict = dspy.Predict(_Summarize)
+        self._predict = dspy.Predict(_Summarize, max_tokens=250)
+        self._extend = dspy.Predict(_ExtendSummary, max_tokens=250)
+        self._summaries: LRUCache[bytes, str] = LRUCache(maxsize=1024, ttl_s=3600)
 
     async def summarize_chat(self, chat: dict[str, Any]) -> str:
         messages = chat.get("messages") or []
         if not messages:
             raise ValueError("chat conversation is empty")
 
-        chat_log = "\n".join(f"{m['sender']}: {m['text']}" for m in messages)
+        lines = [f"{m['sender']}: {m['text']}" for m in messages]
+        digests = _prefix_digests(lines)
+
+        summary = self._summaries.get(digests[-1])
+        if summary is not None:
+            logger.info("chat_summary_cached", message_count=len(messages))
+            return summary
+
+        # longest earlier prefix we already summarized, if any
+        base, previous = 0, None
+        for i in range(len(digests) - 2, -1, -1):
+            previous = self._summaries.get(digests[i])
+            if previous is not None:
+                base = i + 1
+                break
 
         def _run() -> str:
             with dspy.context(lm=self._lm):
-                return self._predict(chat_log=chat_log).summary.strip()
+                if previous is not None:
+                    out = self._extend(previous_summary=previous, new_lines="\n".join(lines[base:]))
+                else:
+                    out = self._predict(chat_log="\n".join(lines))
+            return out.summary.strip()
 
         summary = await asyncio.to_thread(_run)
-        logger.info("chat_summary_done", message_count=len(messages), summary_chars=len(summary))
+        self._summaries.set(digests[-1], summary)
+        logger.info(
+            "chat_summary_done",
+            message_count=len(messages),
+            new_messages=len(messages) - base,
+            summary_chars=len(summary),
+        )
         return summary
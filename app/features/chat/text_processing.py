@@ -1,17 +1,46 @@
-"""Light text utilities: concise rewrite, keyword pull, urgency tag."""
+"""Light text utilities: concise rewrite, keyword pull, urgency tag.
+
+All three are deterministic in their input, so results are kept in a
+process-wide LRU; a repeat of the same text skips the thread hop and the LM
+entirely. cache_stats() reports how well that's doing.
+
+Keywords and urgency are narrow enough for the fast tier; only the rewrite
+stays on main. Urgency also has a lexical shortcut: a message that names
+its own time pressure ("asap", "no rush") in exactly one direction is
+tagged without an LM call.
+
+Each method sits behind its own circuit breaker with a per-call timeout.
+After a run of slow or failed calls the breaker opens and, until a probe
+call succeeds again, make_concise / classify_urgency answer with a local
+fallback (leading words, "Medium") and extract_keywords fails fast with a
+ServiceError instead of queueing behind a struggling provider.
+"""
 
 from __future__ import annotations
 
 import asyncio
-from typing import Literal
+import re
+from collections.abc import Callable, Hashable
+from typing import Any, Literal
 
 import dspy
+import litellm
 
+from app.core.config import get_settings
+from app.core.exceptions import ServiceError
 from app.core.llm import get_lm
 from app.core.logging import get_logger
+from app.shared.breaker import CircuitBreaker
+from app.shared.cache import LRUCache
 
 logger = get_logger(__name__)
 
+_results: LRUCache[Hashable, Any] = LRUCache(maxsize=2048, ttl_s=3600)
+
+
+def cache_stats() -> dict[str, int]:
+    return _results.stats()
+
 
 class _Concise(dspy.Signature):
     """Rewrite text concisely while keeping meaning. Cap at 4 words."""
@@ -21,11 +50,11 @@ class _Concise(dspy.Signature):
 
 
 class _Keywords(dspy.Signature):
-    """Extract up to N key terms or phrases as a comma-separated list."""
+    """Extract up to max_keywords key terms or phrases, most important first."""
 
     text: str = dspy.InputField()
     max_keywords: int = dspy.InputField()
-    keywords: str = dspy.OutputField(desc="Comma-separated, no extra commentary")
+    keywords: list[str] = dspy.OutputField()
 
 
 class _Urgency(dspy.Signature):
@@ -35,12 +64,110 @@ class _Urgency(dspy.Signature):
     urgency: Literal["Low", "Medium", "High"] = dspy.OutputField()
 
 
+class _UrgencyBatch(dspy.Signature):
+    """Classify the urgency of each independent message, in order.
+
+    Consider intensity, time pressure, emotion.
+    """
+
+    texts: list[str] = dspy.InputField()
+    urgencies: list[Literal["Low", "Medium", "High"]] = dspy.OutputField(
+        desc="Exactly one per text, same order"
+    )
+
+
+# provider-side trouble, the only failures that count against a breaker; a
+# reply that fails to parse means the provider is up, just wrong this once.
+# LiteLLM has already retried these (LM_NUM_RETRIES, jittered, honoring
+# Retry-After) by the time they reach us
+_TRANSIENT = (
+    litellm.Timeout,
+    litellm.APIConnectionError,
+    litellm.RateLimitError,
+    litellm.InternalServerError,
+    litellm.ServiceUnavailableError,
+)
+
+# cue words per urgency band; mixed or absent cues go to the LM
+_URGENCY_CUES = {
+    "High": re.compile(
+        r"\b(?:asap|emergency|urgent(?:ly)?|immediately|right now)\b", re.IGNORECASE
+    ),
+    "Low": re.compile(r"\b(?:no rush|no hurry|whenever|fyi)\b", re.IGNORECASE),
+}
+
+
+def _urgency_cue(text: str) -> str | None:
+    hits = [label for label, pattern in _URGENCY_CUES.items() if pattern.search(text)]
+    return hits[0] if len(hits) == 1 else None
+
+
+_URGENCY_BATCH_SIZE = 20
+_MAX_INFLIGHT = 8
+
+
 class TextProcessor:
     def __init__(self) -> None:
         self._lm = get_lm("main")
+        self._fast_lm = get_lm("fast")
         self._concise = dspy.Predict(_Concise)
         self._keywords = dspy.Predict(_Keywords)
-        self._urgency = dspy.Predict(_Urgency)
+        # {"urgency": "Medium"} is ~8 tokens; the schema's enum does the rest
+        self._urgency = dspy.Predict(_Urgency, max_tokens=16)
+        self._urgency_batch = dspy.Predict(_UrgencyBatch, max_tokens=8 * _URGENCY_BATCH_SIZE + 16)
+        self._slots = asyncio.Semaphore(_MAX_INFLIGHT)
+        self._timeout_s = get_settings().TEXT_LM_TIMEOUT_S
+        self._breakers = {m: CircuitBreaker() for m in ("concise", "keywords", "urgency")}
+
+    async def _cached(
+        self,
+        key: tuple[Any, ...],
+        run: Callable[[], Any],
+        fallback: Callable[[], Any] | None = None,
+    ) -> Any:
+        # key[0] names the method; fallback answers aren't cached
+        out = _results.get(key)
+        if out is None:
+            try:
+                out = await self._call(key[0], run)
+            except Exception as e:
+                if fallback is None:
+                    raise
+                logger.warning("text_lm_fallback", method=key[0], error=str(e) or type(e).__name__)
+                return fallback()
+            _results.set(key, out)
+        return out
+
+    async def _call(self, method: str, run: Callable[..., Any], *args: Any) -> Any:
+        breaker = self._breakers[method]
+        if not breaker.allow():
+            raise ServiceError(f"{method} is temporarily unavailable", error_code="CIRCUIT_OPEN")
+        # bounded so a burst here can't take every thread in the default
+        # executor the chat graph and summarizer also run on
+        await self._slots.acquire()
+        # the worker thread can't be cancelled, so on a timeout the caller
+        # stops waiting but the slot stays taken until the thread returns
+        work = asyncio.ensure_future(asyncio.to_thread(run, *args))
+        work.add_done_callback(self._release)
+        try:
+            out = await asyncio.wait_for(asyncio.shield(work), self._timeout_s)
+        except TimeoutError as e:
+            breaker.record_failure()
+            raise ServiceError(f"{method} timed out", error_code="LM_TIMEOUT") from e
+        except _TRANSIENT:
+            breaker.record_failure()
+            raise
+        except Exception:
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return out
+
+    def _release(self, work: asyncio.Future[Any]) -> None:
+        self._slots.release()
+        if not work.cancelled():
+            # mark an abandoned call's error as seen; its caller already timed out
+            work.exception()
 
     async def make_concise(self, text: str) -> str:
         if not text or not text.strip():
@@ -50,7 +177,7 @@ class TextProcessor:
             with dspy.context(lm=self._lm):
                 return self._concise(text=text).concise.strip()
 
-        out = await asyncio.to_thread(_run)
+        out = await self._cached(("concise", text), _run, lambda: " ".join(text.split()[:4]))
         logger.info("concise_done", original=len(text), shrunk=len(out))
         return out
 
@@ -58,12 +185,13 @@ class TextProcessor:
         if not text or not text.strip():
             raise ValueError("text is empty")
 
-        def _run() -> str:
-            with dspy.context(lm=self._lm):
-                return self._keywords(text=text, max_keywords=max_keywords).keywords
+        def _run() -> list[str]:
+            with dspy.context(lm=self._fast_lm):
+                out = self._keywords(text=text, max_keywords=max_keywords).keywords
+            # a JSON array keeps "Smith, Jones & Co" whole; only trim and cap
+            return [k.strip() for k in out if k.strip()][:max_keywords]
 
-        raw = await asyncio.to_thread(_run)
-        kws = [k.strip() for k in raw.split(",") if k.strip()][:max_keywords]
+        kws = list(await self._cached(("keywords", text, max_keywords), _run))
         logger.info("keywords_done", count=len(kws))
         return kws
 
@@ -71,10 +199,54 @@ class TextProcessor:
         if not text or not text.strip():
             raise ValueError("text is empty")
 
+        out = _urgency_cue(text)
+        if out is not None:
+            logger.info("urgency_done", urgency=out, source="cue")
+            return out
+
         def _run() -> str:
-            with dspy.context(lm=self._lm):
+            with dspy.context(lm=self._fast_lm):
                 return self._urgency(text=text).urgency
 
-        out = await asyncio.to_thread(_run)
-        logger.info("urgency_done", urgency=out)
+        out = await self._cached(("urgency", text), _run, lambda: "Medium")
+        logger.info("urgency_done", urgency=out, source="lm")
         return out
+
+    async def classify_urgency_batch(self, texts: list[str]) -> list[str]:
+        """classify_urgency for many texts, up to 20 per LM call.
+
+        Texts with a clear cue or a cached answer skip the LM; only the
+        rest go to it. A chunk whose answer doesn't line up with its inputs
+        is redone one text at a time, and one that fails gets "Medium".
+        """
+        if any(not t or not t.strip() for t in texts):
+            raise ValueError("text is empty")
+
+        out: list[str | None] = [_urgency_cue(t) or _results.get(("urgency", t)) for t in texts]
+        pending = [i for i, u in enumerate(out) if u is None]
+
+        def _run(chunk: list[str]) -> list[str]:
+            with dspy.context(lm=self._fast_lm):
+                return list(self._urgency_batch(texts=chunk).urgencies)
+
+        for start in range(0, len(pending), _URGENCY_BATCH_SIZE):
+            idx = pending[start : start + _URGENCY_BATCH_SIZE]
+            chunk = [texts[i] for i in idx]
+            try:
+                labels = await self._call("urgency", _run, chunk)
+            except Exception as e:
+                logger.warning(
+                    "text_lm_fallback", method="urgency", error=str(e) or type(e).__name__
+                )
+                for i in idx:
+                    out[i] = "Medium"
+                continue
+            if len(labels) != len(chunk):
+                logger.warning("urgency_batch_mismatch", expected=len(chunk), got=len(labels))
+                labels = [await self.classify_urgency(t) for t in chunk]
+            for i, label in zip(idx, labels, strict=True):
+                out[i] = label
+                _results.set(("urgency", texts[i]), label)
+
+        logger.info("urgency_batch_done", count=len(texts), llm_items=len(pending))
+        return out  # type: ignore[return-value]
@@ -2,53 +2,79 @@
 
 from __future__ import annotations
 
+import re
+from functools import lru_cache
 from typing import Any
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+import orjson
+from fastapi import APIRouter, Depends, Request
 
 from app.core.exceptions import ValidationError
 from app.core.logging import get_logger
-from app.features.insights.services import HighLevelInsightEngine, MicroInsightEngine
-from app.shared.http import ok
+from app.features.insights.services import (
+    HighLevelInsightEngine,
+    MicroInsightEngine,
+    normalize_messages,
+    within_budget,
+)
+from app.shared.cache import LRUCache, SingleFlight
+from app.shared.events import EventBatcher
+from app.shared.http import etag_for, not_modified, ok
 from app.shared.schemas import (
     HighLevelInsightRequest,
     InsightRequest,
     MicroInsightResult,
 )
-from app.shared.utils import sanitize_text, truncate_conversation_history
 
 logger = get_logger(__name__)
 router = APIRouter()
 
+# the engine names the sentiment in the insight ("Sentiment: X — ..." or in
+# the sentence itself); one scan picks the first label mentioned
+_SENTIMENT_RE = re.compile(r"\b(Positive|Negative|Neutral)\b")
+
+_micro_log = EventBatcher("micro_insight_logged")
+_high_level_log = EventBatcher("high_level_insights_logged")
+
+_windows: LRUCache[tuple[str, int], list[dict[str, Any]]] = LRUCache(maxsize=1024, ttl_s=900)
+
+# dashboards re-poll /high-level with unchanged inputs; the report for a
+# given input set is kept (and its ETag honoured) instead of regenerated
+_reports: LRUCache[str, str] = LRUCache(maxsize=256, ttl_s=900)
+_reports_inflight: SingleFlight[str, str] = SingleFlight()
 
+
+# one engine per process, built on first request; they hold no per-request state
+@lru_cache(maxsize=1)
 def get_micro() -> MicroInsightEngine:
     return MicroInsightEngine()
 
 
+@lru_cache(maxsize=1)
 def get_high_level() -> HighLevelInsightEngine:
     return HighLevelInsightEngine()
 
 
-def _normalize(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    out = []
-    for m in messages:
-        text = sanitize_text(m.get("content") or m.get("body", ""))
-        if text:
-            out.append(
-                {
-                    "timestamp": m.get("timestamp"),
-                    "sender": m.get("sender", "unknown"),
-                    "body": text,
-                    "content": text,
-                }
-            )
-    return out
+def _recent_window(client_id: str, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """normalize_messages + token trim, remembered per client for an unchanged payload.
+
+    Clients resend the same history between turns (retries, polling), and
+    tokenizing it again is the costly part; hashing the raw fields is not.
+    """
+    sig = tuple(
+        (m.get("sender"), m.get("timestamp"), m.get("content") or m.get("body")) for m in messages
+    )
+    key = (client_id, hash(sig))
+    recent = _windows.get(key)
+    if recent is None:
+        recent = within_budget(normalize_messages(messages))
+        _windows.set(key, recent)
+    return recent
 
 
 @router.post("/micro", response_model=MicroInsightResult)
 async def generate_micro_insight(
     request: InsightRequest,
-    background_tasks: BackgroundTasks,
     engine: MicroInsightEngine = Depends(get_micro),
 ):
     if not request.client_id:
@@ -56,12 +82,10 @@ async def generate_micro_insight(
     if not request.messages:
         raise ValidationError("messages list cannot be empty")
 
-    cleaned = _normalize(request.messages)
-    if not cleaned:
+    recent = _recent_window(request.client_id, request.messages)
+    if not recent:
         raise ValidationError("no valid messages after sanitization")
 
-    recent = truncate_conversation_history(cleaned, max_length=200)
-
     insight = await engine.run_micro_insight_engine(
         client_id=request.client_id,
         client_profile=request.client_profile,
@@ -70,18 +94,10 @@ async def generate_micro_insight(
         previous_sentiment=request.previous_sentiment,
     )
 
-    sentiment = "Neutral"
-    if "Positive" in insight:
-        sentiment = "Positive"
-    elif "Negative" in insight:
-        sentiment = "Negative"
+    match = _SENTIMENT_RE.search(insight)
+    sentiment = match.group(1) if match else "Neutral"
 
-    background_tasks.add_task(
-        logger.info,
-        "micro_insight_logged",
-        client_id=request.client_id,
-        sentiment=sentiment,
-    )
+    _micro_log.emit(client_id=request.client_id, sentiment=sentiment)
     return ok(
         {"insight": insight, "sentiment": sentiment},
         processed_messages=len(recent),
@@ -90,8 +106,20 @@ async def generate_micro_insight(
     )
 
 
+def _report_etag(request: HighLevelInsightRequest) -> str:
+    # everything the prompt is built from; key order in the data doesn't matter
+    data = orjson.dumps(
+        [request.firm_wide_data, request.user_performance_data],
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+    )
+    return etag_for(
+        request.firm_name, request.report_period, request.analysis_date, request.admin_names, data
+    )
+
+
 @router.post("/high-level")
 async def generate_high_level_insights(
+    http_request: Request,
     request: HighLevelInsightRequest,
     engine: HighLevelInsightEngine = Depends(get_high_level),
 ):
@@ -102,15 +130,39 @@ async def generate_high_level_insights(
     if not request.report_period:
         raise ValidationError("report_period is required")
 
-    report = await engine.generate_high_level_insights(
+    etag = _report_etag(request)
+    if (unchanged := not_modified(http_request, etag)) is not None:
+        _high_level_log.emit(
+            firm_name=request.firm_name,
+            report_period=request.report_period,
+            report_length=None,
+            cached=True,
+        )
+        return unchanged
+
+    report = _reports.get(etag)
+    # served without a run of its own: remembered, or joining one in flight
+    cached = report is not None or etag in _reports_inflight
+    if report is None:
+        report = await _reports_inflight.run(
+            etag,
+            lambda: engine.generate_high_level_insights(
+                firm_name=request.firm_name,
+                admin_names=request.admin_names,
+                report_period=request.report_period,
+                analysis_date=request.analysis_date,
+                firm_wide_data=request.firm_wide_data,
+                user_performance_data=request.user_performance_data,
+            ),
+        )
+        _reports.set(etag, report)
+    _high_level_log.emit(
         firm_name=request.firm_name,
-        admin_names=request.admin_names,
         report_period=request.report_period,
-        analysis_date=request.analysis_date,
-        firm_wide_data=request.firm_wide_data,
-        user_performance_data=request.user_performance_data,
+        report_length=len(report),
+        cached=cached,
     )
-    return ok(
+    resp = ok(
         {
             "insights_report": report,
             "report_metadata": {
@@ -123,6 +175,8 @@ async def generate_high_level_insights(
         report_length=len(report),
         data_points_analyzed=len(request.user_performance_data),
     )
+    resp.headers["ETag"] = etag
+    return resp
 
 
 @router.post("/summary")
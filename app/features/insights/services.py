@@ -3,30 +3,139 @@
 Micro insights run on the cheap tier. The high-level report runs on the
 report tier (defaults to Gemini Pro) but the wiring is identical thanks
 to dspy.context().
+
+Clients get polled with the same or near-same conversation, so the micro
+engine keeps its sentiment labels and insights in process-wide LRUs.
+Sentiment is keyed on the text with case and whitespace folded, so
+resends that differ only in formatting also hit.
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
-import re
+import hashlib
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Any, Literal
 
 import dspy
+import orjson
 
-from app.core.llm import get_lm
+from app.core.config import get_settings
+from app.core.llm import count_tokens, get_lm
 from app.core.logging import get_logger
 from app.features.insights.signatures import (
-    AdjustSentiment,
     ClassifyAggregateSentiment,
+    ClassifyAggregateSentimentBatch,
+    FusedMicroInsight,
     HighLevelReport,
     MicroInsight,
     SummaryInsights,
 )
+from app.shared.cache import LRUCache, SingleFlight
+from app.shared.utils import sanitize_recent, truncate_by_tokens
 
 logger = get_logger(__name__)
 Sentiment = Literal["Positive", "Neutral", "Negative"]
 
+# (previous, observed) -> new sentiment. A swing straight across from one
+# pole to the other is treated as marginal and only moves to Neutral; any
+# other reading is taken as observed
+_ADJUST: dict[tuple[Sentiment, Sentiment], Sentiment] = {
+    (prev, obs): "Neutral" if {prev, obs} == {"Positive", "Negative"} else obs
+    for prev in ("Positive", "Neutral", "Negative")
+    for obs in ("Positive", "Neutral", "Negative")
+}
+
+_SENTIMENT_BATCH_SIZE = 20
+# newest messages kept per client before the token trim
+_MAX_MESSAGES = 200
+_REPORT_WORKERS = 8
+
+_sentiments: LRUCache[bytes, Sentiment] = LRUCache(maxsize=4096, ttl_s=3600)
+_insights: LRUCache[bytes, str] = LRUCache(maxsize=2048, ttl_s=3600)
+_fused: LRUCache[bytes, tuple[Sentiment, str]] = LRUCache(maxsize=2048, ttl_s=3600)
+# parallel workers re-processing the same conversation share one call per key
+_inflight: SingleFlight[tuple[str, bytes], Any] = SingleFlight()
+
+
+def _compact_json(data: Any) -> str:
+    # no separator padding or \u escapes: fewer prompt tokens than json.dumps
+    # for the same data, and several times faster on the large report payloads
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def normalize_messages(
+    messages: list[dict[str, Any]], limit: int = _MAX_MESSAGES
+) -> list[dict[str, Any]]:
+    """The last `limit` messages with text left after sanitizing, oldest first.
+
+    Only the kept window is sanitized, and the text is stored once under
+    "body" (the engine reads body first) so it isn't serialized twice into
+    the prompt.
+    """
+    kept = sanitize_recent([m.get("content") or m.get("body", "") for m in messages], limit)
+    return [
+        {
+            "timestamp": messages[i].get("timestamp"),
+            "sender": messages[i].get("sender", "unknown"),
+            "body": text,
+        }
+        for i, text in kept
+    ]
+
+
+def within_budget(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """The newest messages whose text fits INSIGHT_TOKEN_BUDGET, counted with
+    the fast tier's tokenizer (the tier the micro engine runs on).
+
+    The engine's callers pass it a window cut with this; the engine itself
+    reads everything it's given.
+    """
+    messages = [m if "body" in m else {**m, "body": m.get("content") or ""} for m in messages]
+    return truncate_by_tokens(
+        messages, get_settings().INSIGHT_TOKEN_BUDGET, partial(count_tokens, tier="fast")
+    )
+
+
+# the message fields the insight prompt uses, in a fixed order so the same
+# messages always serialize (and cache) the same way
+_MESSAGE_FIELDS = ("timestamp", "sender", "body", "content")
+
+
+def _prompt_json(client_info: dict[str, Any], messages: list[dict[str, Any]]) -> tuple[str, str]:
+    # look up the four fields rather than walk every key of every message
+    recent = [{k: m[k] for k in _MESSAGE_FIELDS if k in m} for m in messages]
+    return (
+        orjson.dumps(
+            client_info or {}, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        ).decode(),
+        _compact_json(recent),
+    )
+
+
+def _fallback_insight(previous_sentiment: Sentiment | None) -> str:
+    return (
+        f"Sentiment: {previous_sentiment or 'Neutral'} — Recent client interaction requires review."
+    )
+
+
+def _finish(insight: str, sentiment: Sentiment) -> str:
+    if insight and insight[-1] not in ".!?":
+        insight += "."
+    if sentiment not in insight:
+        insight = f"Sentiment: {sentiment} — {insight}"
+    return insight
+
+
+def _digest(*parts: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p.encode())
+        h.update(b"\x00")
+    return h.digest()
+
 
 class MicroInsightEngine:
     """Per-client single-sentence insight + sentiment update."""
@@ -34,38 +143,80 @@ class MicroInsightEngine:
     def __init__(self) -> None:
         self._lm = get_lm("fast")
         self._classify = dspy.Predict(ClassifyAggregateSentiment)
-        self._adjust = dspy.Predict(AdjustSentiment)
-        self._insight = dspy.Predict(MicroInsight)
+        self._classify_batch = dspy.Predict(ClassifyAggregateSentimentBatch)
+        # one sentence (plus the JSON around it) needs well under 100 tokens;
+        # the cap stops a model that rambles past the first sentence
+        self._insight = dspy.Predict(MicroInsight, max_tokens=120)
+        self._fused = dspy.Predict(FusedMicroInsight, max_tokens=140)
+        self._fused_enabled = get_settings().INSIGHT_FUSED
 
     async def classify_sentiment(self, text: str) -> Sentiment:
+        key = _digest(" ".join(text.lower().split()))
+        cached = _sentiments.get(key)
+        if cached is not None:
+            return cached
+
         def _run() -> Sentiment:
             with dspy.context(lm=self._lm):
                 return self._classify(text=text).sentiment
 
-        return await asyncio.to_thread(_run)
+        sentiment = await _inflight.run(("sentiment", key), lambda: asyncio.to_thread(_run))
+        _sentiments.set(key, sentiment)
+        return sentiment
+
+    async def classify_sentiment_batch(self, texts: list[str]) -> list[Sentiment]:
+        """classify_sentiment for many texts (e.g. one per client in a
+        scheduled sweep), up to 20 per LM call.
+
+        Cached texts are answered from the cache; a chunk whose call fails
+        or whose answer doesn't line up with its inputs is redone one text
+        at a time.
+        """
+        keys = [_digest(" ".join(t.lower().split())) for t in texts]
+        out: list[Sentiment | None] = [_sentiments.get(k) for k in keys]
+        pending = [i for i, s in enumerate(out) if s is None]
+
+        def _run(chunk: list[str]) -> list[Sentiment]:
+            with dspy.context(lm=self._lm):
+                return list(self._classify_batch(texts=chunk).sentiments)
+
+        for start in range(0, len(pending), _SENTIMENT_BATCH_SIZE):
+            idx = pending[start : start + _SENTIMENT_BATCH_SIZE]
+            chunk = [texts[i] for i in idx]
+            labels: list[Sentiment] | None
+            try:
+                labels = await asyncio.to_thread(_run, chunk)
+            except Exception as e:
+                logger.warning("sentiment_batch_failed", size=len(chunk), error=str(e))
+                labels = None
+            else:
+                if len(labels) != len(chunk):
+                    logger.warning("sentiment_batch_mismatch", expected=len(chunk), got=len(labels))
+                    labels = None
+            if labels is None:
+                labels = [await self.classify_sentiment(t) for t in chunk]
+            for i, label in zip(idx, labels, strict=True):
+                out[i] = label
+                _sentiments.set(keys[i], label)
+
+        logger.info("sentiment_batch_done", count=len(texts), llm_items=len(pending))
+        return out  # type: ignore[return-value]
 
     async def adjust_sentiment(
         self,
         previous: Sentiment | None,
         messages: list[dict[str, Any]],
     ) -> Sentiment:
-        text = "\n".join(str(m.get("body") or m.get("content") or "") for m in messages[-500:])
+        # join sizes its output from a list in one pass; a generator it
+        # would first copy into one anyway
+        text = "\n".join([str(m.get("body") or m.get("content") or "") for m in messages])
         if not text.strip():
             return previous or "Neutral"
 
         observed = await self.classify_sentiment(text)
         if previous is None:
             return observed
-
-        def _run() -> Sentiment:
-            with dspy.context(lm=self._lm):
-                return self._adjust(previous=previous, observed=observed).sentiment
-
-        try:
-            return await asyncio.to_thread(_run)
-        except Exception as e:  # noqa: BLE001
-            logger.warning("adjust_sentiment_failed", error=str(e))
-            return previous
+        return _ADJUST[(previous, observed)]
 
     async def generate_insight(
         self,
@@ -74,28 +225,64 @@ class MicroInsightEngine:
         previous_insight: str | None,
         current_sentiment: Sentiment,
     ) -> str:
-        # only keep the last 200 messages; trim each to the fields we actually use
-        recent = [
-            {k: v for k, v in m.items() if k in ("timestamp", "sender", "body", "content")}
-            for m in messages[-200:]
-        ]
+        profile_json, recent_json = _prompt_json(client_info, messages)
+        key = _digest(profile_json, recent_json, previous_insight or "", current_sentiment)
+        cached = _insights.get(key)
+        if cached is not None:
+            return cached
 
         def _run() -> str:
             with dspy.context(lm=self._lm):
                 return self._insight(
-                    client_profile_json=json.dumps(client_info or {}, ensure_ascii=False),
-                    recent_messages_json=json.dumps(recent, ensure_ascii=False),
+                    client_profile_json=profile_json,
+                    recent_messages_json=recent_json,
                     previous_insight=previous_insight or "",
                     current_sentiment=current_sentiment,
                 ).insight.strip()
 
-        insight = await asyncio.to_thread(_run)
-        if insight and insight[-1] not in ".!?":
-            insight += "."
-        if current_sentiment not in insight:
-            insight = f"Sentiment: {current_sentiment} — {insight}"
+        insight = _finish(
+            await _inflight.run(("insight", key), lambda: asyncio.to_thread(_run)),
+            current_sentiment,
+        )
+        _insights.set(key, insight)
         return insight
 
+    async def generate_fused(
+        self,
+        client_info: dict[str, Any],
+        messages: list[dict[str, Any]],
+        previous_insight: str | None,
+        previous_sentiment: Sentiment | None,
+    ) -> tuple[Sentiment, str]:
+        """Sentiment and insight from one LM call instead of two.
+
+        The observed sentiment still goes through the same reconciliation
+        with previous_sentiment as adjust_sentiment.
+        """
+        profile_json, recent_json = _prompt_json(client_info, messages)
+        key = _digest(profile_json, recent_json, previous_insight or "", previous_sentiment or "")
+        cached = _fused.get(key)
+        if cached is not None:
+            return cached
+
+        def _run() -> Any:
+            with dspy.context(lm=self._lm):
+                return self._fused(
+                    client_profile_json=profile_json,
+                    recent_messages_json=recent_json,
+                    previous_insight=previous_insight or "",
+                )
+
+        out = await _inflight.run(("fused", key), lambda: asyncio.to_thread(_run))
+        sentiment = (
+            out.sentiment
+            if previous_sentiment is None
+            else _ADJUST[(previous_sentiment, out.sentiment)]
+        )
+        result = (sentiment, _finish(out.insight.strip(), sentiment))
+        _fused.set(key, result)
+        return result
+
     async def run_micro_insight_engine(
         self,
         client_id: str,
@@ -104,14 +291,26 @@ class MicroInsightEngine:
         previous_insight: str | None = None,
         previous_sentiment: Sentiment | None = None,
     ) -> str:
+        client_info = {"client_id": client_id, **client_profile}
         try:
-            sentiment = await self.adjust_sentiment(previous_sentiment, messages)
-            insight = await self.generate_insight(
-                client_info={"client_id": client_id, **client_profile},
-                messages=messages,
-                previous_insight=previous_insight,
-                current_sentiment=sentiment,
-            )
+            fused = None
+            if self._fused_enabled:
+                try:
+                    fused = await self.generate_fused(
+                        client_info, messages, previous_insight, previous_sentiment
+                    )
+                except Exception as e:
+                    logger.warning("micro_insight_fused_failed", client_id=client_id, error=str(e))
+            if fused is not None:
+                sentiment, insight = fused
+            else:
+                sentiment = await self.adjust_sentiment(previous_sentiment, messages)
+                insight = await self.generate_insight(
+                    client_info=client_info,
+                    messages=messages,
+                    previous_insight=previous_insight,
+                    current_sentiment=sentiment,
+                )
             logger.info(
                 "micro_insight_done",
                 client_id=client_id,
@@ -121,7 +320,36 @@ class MicroInsightEngine:
             return insight
         except Exception as e:  # noqa: BLE001
             logger.error("micro_insight_failed", client_id=client_id, error=str(e))
-            return f"Sentiment: {previous_sentiment or 'Neutral'} — Recent client interaction requires review."
+            return _fallback_insight(previous_sentiment)
+
+    async def run_many(self, jobs: list[dict[str, Any]]) -> list[str]:
+        """run_micro_insight_engine for several clients; one insight per job,
+        in order. Each job holds that method's keyword arguments.
+
+        Clients are independent, so they run concurrently, up to
+        INSIGHT_MAX_CONCURRENCY at a time. Within a client the insight still
+        waits on its sentiment. Each client's messages are sanitized, capped
+        and cut to the token budget first, as /micro does; a job that fails
+        there gets the same fallback insight as a failed engine run, so one
+        bad client can't fail the batch.
+        """
+        sem = asyncio.Semaphore(get_settings().INSIGHT_MAX_CONCURRENCY)
+
+        async def one(job: dict[str, Any]) -> str:
+            async with sem:
+                messages = within_budget(normalize_messages(job["messages"]))
+                return await self.run_micro_insight_engine(**{**job, "messages": messages})
+
+        results = await asyncio.gather(*(one(job) for job in jobs), return_exceptions=True)
+        insights = []
+        for job, result in zip(jobs, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(
+                    "micro_insight_failed", client_id=job.get("client_id"), error=str(result)
+                )
+                result = _fallback_insight(job.get("previous_sentiment"))
+            insights.append(result)
+        return insights
 
 
 class HighLevelInsightEngine:
@@ -131,6 +359,19 @@ class HighLevelInsightEngine:
         self._lm = get_lm("report")
         self._report = dspy.Predict(HighLevelReport)
         self._summary = dspy.Predict(SummaryInsights)
+        # reports hold a thread for tens of seconds; a burst of them gets its
+        # own small pool instead of filling the default executor that the
+        # chat graph and the other features share
+        self._executor = ThreadPoolExecutor(
+            max_workers=_REPORT_WORKERS, thread_name_prefix="report"
+        )
+
+    async def _call(self, run: Callable[[], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+
+    async def aclose(self) -> None:
+        """Release the report pool; reports still queued are dropped."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
     async def generate_high_level_insights(
         self,
@@ -143,7 +384,7 @@ class HighLevelInsightEngine:
     ) -> str:
         admin_list = ", ".join(admin_names)
         recipients = ", ".join(f"{n} <email@example.com>" for n in admin_names)
-        template = _REPORT_TEMPLATE.format(
+        header = _REPORT_HEADER.format(
             firm_name=firm_name,
             report_period=report_period,
             analysis_date=analysis_date,
@@ -154,12 +395,12 @@ class HighLevelInsightEngine:
         def _run() -> str:
             with dspy.context(lm=self._lm):
                 return self._report(
-                    template=template,
-                    firm_wide_data_json=json.dumps(firm_wide_data),
-                    user_performance_json=json.dumps(user_performance_data),
+                    header=header,
+                    firm_wide_data_json=_compact_json(firm_wide_data),
+                    user_performance_json=_compact_json(user_performance_data),
                 ).report.strip()
 
-        report = await asyncio.to_thread(_run)
+        report = await self._call(_run)
         logger.info(
             "high_level_report_done",
             firm=firm_name,
@@ -173,24 +414,18 @@ class HighLevelInsightEngine:
         firm_data: dict[str, Any],
         time_period: str = "monthly",
     ) -> dict[str, Any]:
-        def _run() -> str:
+        def _run() -> list[Any]:
             with dspy.context(lm=self._lm):
                 return self._summary(
-                    firm_data_json=json.dumps(firm_data),
+                    firm_data_json=_compact_json(firm_data),
                     time_period=time_period,
-                ).json_payload
+                ).insights
 
-        raw = await asyncio.to_thread(_run)
-        try:
-            return json.loads(raw)
-        except json.JSONDecodeError:
-            match = re.search(r"\{.*\}", raw, re.DOTALL)
-            if not match:
-                raise
-            return json.loads(match.group())
+        insights = await self._call(_run)
+        return {"insights": [i.model_dump() for i in insights]}
 
 
-_REPORT_TEMPLATE = """\
+_REPORT_HEADER = """\
 This monthly insight report for {firm_name} is ready for your review. If approved, please forward to the designated recipients:
 {recipients}
 
@@ -198,28 +433,4 @@ This monthly insight report for {firm_name} is ready for your review. If approve
 **Report for Period:** {report_period}
 **Date of Analysis:** {analysis_date}
 **Prepared For:** {admin_list}, {firm_name}
-
----
-
-**Executive Summary:**
-[2-4 sentence summary of all key findings and their implications]
-
----
-
-**1 - [Compelling Title for Finding #1]**
-
-**What I'm seeing:** [data pattern]
-**Why it matters:** [business impact]
-**How to fix it:** [actionable recommendation]
-
----
-
-(More numbered sections for each significant insight)
-
----
-
-**Summary of Action Items:**
-
-**Priority 1:** [most urgent recommendation]
-**Priority 2:** [second-most urgent recommendation]
 """
@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import Literal
 
 import dspy
+from pydantic import BaseModel
 
 Sentiment = Literal["Positive", "Neutral", "Negative"]
 
@@ -16,15 +17,11 @@ class ClassifyAggregateSentiment(dspy.Signature):
     sentiment: Sentiment = dspy.OutputField()
 
 
-class AdjustSentiment(dspy.Signature):
-    """Decide whether sentiment should change.
+class ClassifyAggregateSentimentBatch(dspy.Signature):
+    """Classify the aggregate sentiment of each independent text, in order."""
 
-    If the new observation is unclear or marginal, keep the previous value.
-    """
-
-    previous: Sentiment = dspy.InputField()
-    observed: Sentiment = dspy.InputField()
-    sentiment: Sentiment = dspy.OutputField()
+    texts: list[str] = dspy.InputField()
+    sentiments: list[Sentiment] = dspy.OutputField(desc="Exactly one per text, same order")
 
 
 class MicroInsight(dspy.Signature):
@@ -44,31 +41,75 @@ class MicroInsight(dspy.Signature):
     insight: str = dspy.OutputField()
 
 
+class FusedMicroInsight(dspy.Signature):
+    """Read the client's recent messages, then (1) classify their aggregate
+    sentiment and (2) write one sentence a case manager can read to
+    instantly understand what's going on with the client right now.
+
+    Embed that sentiment naturally in the sentence (do not just prefix with
+    'Sentiment: X'). Focus on tone, preferences, and the most actionable
+    cue. Don't repeat the previous insight verbatim.
+    """
+
+    client_profile_json: str = dspy.InputField()
+    recent_messages_json: str = dspy.InputField()
+    previous_insight: str = dspy.InputField()
+
+    sentiment: Sentiment = dspy.OutputField(desc="Aggregate sentiment of the recent messages")
+    insight: str = dspy.OutputField()
+
+
 class HighLevelReport(dspy.Signature):
     """Write a structured business-intelligence report for firm leadership.
 
-    Follow the exact email-body structure in the user prompt. Each finding
-    section answers three questions in this order:
-      'What I'm seeing', 'Why it matters', 'How to fix it'.
-    Close with a 'Summary of Action Items' prioritized list.
+    Start with the pre-filled header exactly as given, then follow this
+    email-body structure:
+
+    ---
+
+    **Executive Summary:**
+    [2-4 sentence summary of all key findings and their implications]
+
+    ---
+
+    **1 - [Compelling Title for Finding #1]**
+
+    **What I'm seeing:** [data pattern]
+    **Why it matters:** [business impact]
+    **How to fix it:** [actionable recommendation]
+
+    ---
+
+    (More numbered sections for each significant insight)
+
+    ---
+
+    **Summary of Action Items:**
+
+    **Priority 1:** [most urgent recommendation]
+    **Priority 2:** [second-most urgent recommendation]
+
     Output the email body text only, no commentary.
     """
 
-    template: str = dspy.InputField(desc="The required email body template, pre-filled with metadata")
+    # the fixed structure lives in the instructions above, so the system
+    # message is identical across firms and the per-call part stays small
+    header: str = dspy.InputField(desc="Report header, pre-filled with this firm's metadata")
     firm_wide_data_json: str = dspy.InputField()
     user_performance_json: str = dspy.InputField()
 
     report: str = dspy.OutputField()
 
 
-class SummaryInsights(dspy.Signature):
-    """Produce 3-5 dashboard-ready insights as JSON.
+class Insight(BaseModel):
+    title: str
+    description: str
 
-    Format: { "insights": [ { "title": "...", "description": "..." }, ... ] }
-    Output ONLY valid JSON, no surrounding prose.
-    """
+
+class SummaryInsights(dspy.Signature):
+    """Produce 3-5 dashboard-ready insights."""
 
     firm_data_json: str = dspy.InputField()
     time_period: str = dspy.InputField()
 
-    json_payload: str = dspy.OutputField()
+    insights: list[Insight] = dspy.OutputField(desc="3-5 items")
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any
 
 from fastapi import APIRouter, BackgroundTasks, Depends
@@ -49,12 +50,16 @@ class AppointmentReminderScheduleRequest(BaseModel):
     reminder_schedule: list[str] | None = None
 
 
+# one instance per process, built on first request; the scheduler shares the
+# generator rather than building its own
+@lru_cache(maxsize=1)
 def get_generator() -> OutboundMessageGenerator:
     return OutboundMessageGenerator()
 
 
+@lru_cache(maxsize=1)
 def get_scheduler() -> MessageScheduler:
-    return MessageScheduler()
+    return MessageScheduler(get_generator())
 
 
 def _clean_history(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -19,6 +19,8 @@ from app.features.outbound.signatures import (
 
 logger = get_logger(__name__)
 
+_REMINDER_CONCURRENCY = 4
+
 
 def _strip_quotes(text: str) -> str:
     return text.strip().strip('"').strip("'")
@@ -28,19 +30,16 @@ class OutboundMessageGenerator:
     """Drafts outbound messages: weekly check-in, follow-up, appointment, case update."""
 
     def __init__(self) -> None:
-        base = get_lm("main")
-        # warmer-than-default temperature for natural prose
-        self._lm = dspy.LM(
-            model=base.model,
-            api_key=base.kwargs.get("api_key"),
-            temperature=0.5,
-            max_tokens=512,
-        )
         self._checkin = dspy.Predict(OutboundCheckIn)
         self._followup = dspy.Predict(FollowUp)
         self._appointment = dspy.Predict(AppointmentReminder)
         self._case_update = dspy.Predict(CaseUpdate)
 
+    @property
+    def _lm(self) -> dspy.LM:
+        # warmer-than-default temperature for natural prose
+        return get_lm("main", temperature=0.5, max_tokens=512)
+
     async def generate_outbound_message(
         self,
         information: str,
@@ -168,21 +167,26 @@ class MessageScheduler:
         schedule = reminder_schedule or ["advance", "day_before", "same_day"]
         client_name = appointment_details.get("client_name")
 
-        results = []
-        for kind in schedule:
-            text = await self.generator.generate_appointment_reminder(
-                appointment_details=appointment_details,
-                client_name=client_name,
-                reminder_type=kind,
-            )
-            results.append(
-                {
-                    "client_id": client_id,
-                    "message_type": f"appointment_reminder_{kind}",
-                    "message_content": text,
-                    "appointment_id": appointment_details.get("appointment_id"),
-                    "reminder_type": kind,
-                    "status": "scheduled",
-                }
-            )
-        return results
+        # the drafts are independent, so write them concurrently (a few at a time)
+        sem = asyncio.Semaphore(_REMINDER_CONCURRENCY)
+
+        async def draft(kind: str) -> str:
+            async with sem:
+                return await self.generator.generate_appointment_reminder(
+                    appointment_details=appointment_details,
+                    client_name=client_name,
+                    reminder_type=kind,
+                )
+
+        texts = await asyncio.gather(*(draft(kind) for kind in schedule))
+        return [
+            {
+                "client_id": client_id,
+                "message_type": f"appointment_reminder_{kind}",
+                "message_content": text,
+                "appointment_id": appointment_details.get("appointment_id"),
+                "reminder_type": kind,
+                "status": "scheduled",
+            }
+            for kind, text in zip(schedule, texts, strict=True)
+        ]
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,29 +20,49 @@ from app.core.exceptions import (
     service_exception_handler,
     validation_exception_handler,
 )
-from app.core.llm import configure_default_lm
-from app.core.logging import get_logger, setup_logging
+from app.core.llm import close_http_clients, configure_default_lm, open_http_clients
+from app.core.logging import get_logger, setup_logging, shutdown_logging
 from app.core.rate_limit import limiter
+from app.core.responses import ORJSONResponse
 from app.features.agent import router as agent_router
 from app.features.chat import router as chat_router
 from app.features.insights import router as insights_router
+from app.features.insights.routes import get_high_level
 from app.features.outbound import router as outbound_router
+from app.shared.events import start_batchers, stop_batchers
 from app.shared.middleware import error_handling_middleware, request_logging_middleware
 
-settings = get_settings()
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    settings = get_settings()
     setup_logging()
     log = get_logger(__name__)
+    app.state.http_client, app.state.ahttp_client = open_http_clients()
     configure_default_lm()
+    try:
+        limiter.preload_scripts()
+    except Exception as e:
+        # not fatal: EVALSHA falls back to loading the script on first use
+        log.warning("rate_limit_script_preload_failed", error=str(e))
+    sweeper = asyncio.create_task(limiter.sweep_local_cache())
+    start_batchers()
     log.info("startup", env=settings.ENVIRONMENT, version=settings.API_VERSION)
     yield
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
+    await stop_batchers()
+    # only if a report was ever asked for; don't build the engine just to close it
+    if get_high_level.cache_info().currsize:
+        await get_high_level().aclose()
+    await close_http_clients()
     log.info("shutdown")
+    shutdown_logging()
 
 
 def create_application() -> FastAPI:
+    settings = get_settings()
     setup_logging()
     show_docs = not settings.is_prod
 
@@ -53,6 +74,7 @@ def create_application() -> FastAPI:
         redoc_url="/api/redoc" if show_docs else None,
         openapi_url="/api/openapi.json" if show_docs else None,
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     # CORS + trusted host
@@ -112,6 +134,7 @@ app = create_application()
 if __name__ == "__main__":
     import uvicorn
 
+    settings = get_settings()
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
@@ -7,6 +7,7 @@ from app.shared.schemas import (
     ClientInfo,
     ConciseRequest,
     ConciseResult,
+    ConversationBatch,
     ConversationHistory,
     ErrorResponse,
     HighLevelInsightRequest,
@@ -19,7 +20,10 @@ from app.shared.schemas import (
 )
 from app.shared.utils import (
     extract_client_context,
+    sanitize_recent,
     sanitize_text,
+    sanitize_texts,
+    truncate_by_tokens,
     truncate_conversation_history,
 )
 
@@ -30,6 +34,7 @@ __all__ = [
     "ClientInfo",
     "ConciseRequest",
     "ConciseResult",
+    "ConversationBatch",
     "ConversationHistory",
     "ErrorResponse",
     "HighLevelInsightRequest",
@@ -40,6 +45,9 @@ __all__ = [
     "OutboundMessageRequest",
     "OutboundMessageResult",
     "extract_client_context",
+    "sanitize_recent",
     "sanitize_text",
+    "sanitize_texts",
+    "truncate_by_tokens",
     "truncate_conversation_history",
 ]
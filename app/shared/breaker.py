@@ -0,0 +1,55 @@
+"""Consecutive-failure circuit breaker for calls with a cheap fallback.
+
+closed    — calls go through; failures in a row are counted
+open      — after `threshold` failures in a row, calls are refused for
+            `cooldown_s` so callers take their fallback immediately
+half-open — once the cooldown passes, one call is let through as a probe;
+            success closes the breaker, failure opens it again
+
+Like the caches, it's only touched from the event loop, so no locking.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Literal
+
+State = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown_s: float = 60.0) -> None:
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> State:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.cooldown_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; claims the probe when half-open."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.threshold:
+            self._opened_at = time.monotonic()
+        self._probing = False
@@ -0,0 +1,120 @@
+"""Small in-process caches for request preprocessing.
+
+LRUCache and SingleFlight are touched only from the event loop and never
+await while holding state, so there's no locking. BlockingSingleFlight is
+the worker-thread counterpart and does lock.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """OrderedDict-backed LRU with an optional per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl_s: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if self.ttl_s is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s is not None else 0.0
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight(Generic[K, V]):
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller's coroutine runs as a task; callers arriving while it's
+    in flight await the same task. Each waiter is shielded, so one of them
+    disconnecting doesn't cancel the work for the rest. The key is released
+    as soon as the task finishes: this dedupes, it doesn't cache.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[K, asyncio.Task[V]] = {}
+
+    async def run(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._inflight
+
+
+class BlockingSingleFlight(Generic[K, V]):
+    """SingleFlight for synchronous code running on worker threads.
+
+    The first thread to ask for a key runs fn; threads asking for the same
+    key meanwhile block on its result (or its exception). Like SingleFlight,
+    the key is released once fn returns.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: dict[K, Future[V]] = {}
+
+    def run(self, key: K, fn: Callable[[], V]) -> V:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
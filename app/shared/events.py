@@ -0,0 +1,106 @@
+"""Batched, bounded fire-and-forget log events.
+
+Routes used to schedule a BackgroundTask per request just to emit one log
+line. An EventBatcher instead takes events on a bounded queue and a single
+drain task per batcher writes them out in batches. When the queue is full,
+new events are dropped and counted rather than piling up in memory.
+
+Batchers register themselves on creation; the app lifespan starts and stops
+all of them via start_batchers() / stop_batchers(). Before start (e.g. a
+bare TestClient with no lifespan) emit() just logs inline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import Any
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_batchers: list[EventBatcher] = []
+
+
+class EventBatcher:
+    def __init__(
+        self,
+        event: str,
+        maxsize: int = 1000,
+        batch_size: int = 50,
+        flush_interval_s: float = 0.2,
+    ) -> None:
+        self.event = event
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.dropped = 0
+        # created in start(), on the loop that will drain it
+        self._queue: asyncio.Queue[dict[str, Any]] | None = None
+        self._task: asyncio.Task[None] | None = None
+        _batchers.append(self)
+
+    def emit(self, **fields: Any) -> None:
+        if self._queue is None:
+            logger.info(self.event, **fields)
+            return
+        try:
+            self._queue.put_nowait(fields)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._task = asyncio.create_task(self._drain())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        queue, self._queue, self._task = self._queue, None, None
+        leftover = []
+        while queue is not None and not queue.empty():
+            leftover.append(queue.get_nowait())
+        if leftover:
+            self._flush(leftover)
+
+    async def _drain(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval_s
+            # flushed even when stop() cancels us mid-batch, so events
+            # already taken off the queue aren't lost
+            try:
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    # not wait_for: on 3.11 it can swallow stop()'s cancel
+                    # when the get() finishes at the same moment
+                    try:
+                        async with asyncio.timeout(timeout):
+                            batch.append(await self._queue.get())
+                    except TimeoutError:
+                        break
+            finally:
+                self._flush(batch)
+
+    def _flush(self, batch: list[dict[str, Any]]) -> None:
+        dropped, self.dropped = self.dropped, 0
+        logger.info(self.event, count=len(batch), dropped=dropped, events=batch)
+
+
+def start_batchers() -> None:
+    for b in _batchers:
+        b.start()
+
+
+async def stop_batchers() -> None:
+    for b in _batchers:
+        await b.stop()
@@ -9,9 +9,9 @@ import time
 from collections.abc import Awaitable, Callable
 
 from fastapi import Request, Response
-from fastapi.responses import JSONResponse
 
 from app.core.logging import get_logger
+from app.core.responses import ORJSONResponse
 
 logger = get_logger(__name__)
 
@@ -20,7 +20,7 @@ async def request_logging_middleware(
     request: Request,
     call_next: Callable[[Request], Awaitable[Response]],
 ) -> Response:
-    started = time.time()
+    started = time.perf_counter()
     client_ip = request.client.host if request.client else "unknown"
 
     logger.info(
@@ -32,7 +32,7 @@ async def request_logging_middleware(
 
     response = await call_next(request)
 
-    duration = time.time() - started
+    duration = time.perf_counter() - started
     logger.info(
         "http_request_out",
         method=request.method,
@@ -59,7 +59,7 @@ async def error_handling_middleware(
             exc_type=type(exc).__name__,
             exc_info=True,
         )
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "error": {
@@ -2,17 +2,21 @@
 Shared Pydantic models for request/response schemas.
 """
 
-from datetime import datetime
+from datetime import UTC, datetime
+from functools import partial
 from typing import Dict, List, Optional, Any, Literal
 from pydantic import BaseModel, Field
 
+# tz-aware; datetime.utcnow() is deprecated as of 3.12
+_utcnow = partial(datetime.now, UTC)
+
 
 # Base models
 class BaseResponse(BaseModel):
     """Base response model with common fields."""
     
     success: bool = Field(default=True, description="Whether the request was successful")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Response timestamp")
+    timestamp: datetime = Field(default_factory=_utcnow, description="Response timestamp")
     request_id: Optional[str] = Field(default=None, description="Request identifier for tracing")
 
 
@@ -21,7 +25,7 @@ class ErrorResponse(BaseModel):
     
     error: Dict[str, Any] = Field(description="Error details")
     success: bool = Field(default=False, description="Always false for errors")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Error timestamp")
+    timestamp: datetime = Field(default_factory=_utcnow, description="Error timestamp")
 
 
 # Chat and message models
@@ -48,6 +52,14 @@ class ConversationHistory(BaseModel):
     client_info: ClientInfo = Field(description="Client information")
 
 
+class ConversationBatch(BaseModel):
+    """Several conversations to analyze in one request."""
+    
+    conversations: list[ConversationHistory] = Field(
+        min_length=1, max_length=50, description="Conversations to analyze, results come back in the same order"
+    )
+
+
 # Analysis models
 class TriageDecision(BaseModel):
     """Triage decision for message processing."""
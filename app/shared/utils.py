@@ -2,23 +2,84 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Sequence
 from typing import Any
 
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# C0 controls + DEL, minus tab / newline / carriage return
+_CONTROL_CHARS = dict.fromkeys(c for c in (*range(32), 127) if chr(c) not in "\t\n\r")
+
 
 def sanitize_text(text: str | None, max_length: int = 10_000) -> str:
+    """Strip, drop control characters (tab / newline / CR kept), cap length."""
     if not text or not isinstance(text, str):
         return ""
-    out = text.strip()
+    out = text.translate(_CONTROL_CHARS).strip()
     if len(out) > max_length:
         logger.warning("text_truncated", original=len(out), cap=max_length)
         out = out[:max_length] + "..."
     return out
 
 
+def sanitize_texts(texts: list[str | None], max_length: int = 10_000) -> list[str]:
+    """sanitize_text over a whole list, with one truncation log per batch."""
+    out = [t.translate(_CONTROL_CHARS).strip() if t and isinstance(t, str) else "" for t in texts]
+    over = [i for i, t in enumerate(out) if len(t) > max_length]
+    if over:
+        logger.warning("text_truncated", count=len(over), cap=max_length)
+        for i in over:
+            out[i] = out[i][:max_length] + "..."
+    return out
+
+
+def sanitize_recent(
+    texts: Sequence[str | None],
+    limit: int | None = None,
+    max_length: int = 10_000,
+) -> list[tuple[int, str]]:
+    """(index, sanitized text) for the last `limit` texts that survive
+    sanitization, oldest first — sanitize + drop empties + truncate in one go.
+
+    Walks back from the newest in chunks of whatever is still missing, so
+    texts that truncation would throw away are never sanitized. Usually
+    that's a single chunk.
+    """
+    if limit is None:
+        limit = len(texts)
+    out: list[tuple[int, str]] = []
+    end = len(texts)
+    while end > 0 and len(out) < limit:
+        start = max(0, end - (limit - len(out)))
+        cleaned = sanitize_texts(list(texts[start:end]), max_length)
+        out[:0] = [(i, t) for i, t in enumerate(cleaned, start) if t]
+        end = start
+    return out
+
+
+def truncate_by_tokens(
+    messages: list[dict[str, Any]],
+    budget: int,
+    count: Callable[[str], int],
+    key: str = "body",
+) -> list[dict[str, Any]]:
+    """The newest messages whose `key` text fits in `budget` tokens.
+
+    Counts from the newest back and stops at the first message that would
+    overflow, so older messages are never tokenized. The newest message is
+    always kept, even on its own over budget.
+    """
+    total = kept = 0
+    for m in reversed(messages):
+        total += count(m[key])
+        if total > budget and kept:
+            break
+        kept += 1
+    return messages[len(messages) - kept :]
+
+
 def truncate_conversation_history(
     messages: list[dict[str, Any]],
     max_length: int = 500,
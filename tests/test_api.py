@@ -2,11 +2,23 @@
 Basic tests for the API endpoints.
 """
 
+import asyncio
+import json
+import re
+from datetime import timedelta
+
+import httpx
 import pytest
+from fastapi import FastAPI
+from fastapi.openapi.models import OpenAPI
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch
 
+from app.core.config import Settings
 from app.main import app
+from app.shared import BaseResponse, ErrorResponse
+from app.shared.cache import LRUCache
+from app.shared.schemas import ConversationHistory
 
 client = TestClient(app)
 
@@ -72,6 +84,63 @@ class TestChatEndpoints:
         assert data["success"] is True
         assert "data" in data
     
+    @patch('app.features.chat.services.ChatOrchestrator.analyze_message', new_callable=AsyncMock)
+    def test_analyze_follow_up_turn_only_cleans_the_new_message(self, mock_analyze):
+        """Test a resent history reuses its sanitized prefix."""
+        from app.features.chat import routes
+
+        mock_analyze.return_value = {"action": "RESPOND"}
+        cleaned = []
+        clean_messages = routes._clean_messages
+
+        def recording(messages, *args, **kwargs):
+            cleaned.append(len(messages))
+            return clean_messages(messages, *args, **kwargs)
+
+        turns = [
+            {"sender": "client", "content": f"message {i}", "timestamp": f"2023-01-01T10:0{i}:00Z"}
+            for i in range(4)
+        ]
+
+        def post(messages):
+            body = {"messages": messages, "client_info": {"client_id": "prefix_client"}}
+            return client.post("/api/v1/chat/analyze", json=body)
+
+        with patch.object(routes, "_clean_messages", recording):
+            assert post(turns[:3]).status_code == 200
+            assert post(turns).status_code == 200
+            # an edited earlier message can't reuse the stale prefix
+            edited = [{**turns[0], "content": "edited"}, *turns[1:]]
+            assert post(edited).status_code == 200
+
+        assert cleaned == [3, 1, 4]
+        history = mock_analyze.await_args_list[-1].kwargs["conversation_history"]
+        assert history[0]["content"] == "edited"
+
+    @patch('app.features.chat.services.ChatOrchestrator.analyze_message', new_callable=AsyncMock)
+    def test_analyze_concurrent_identical_requests_share_one_run(self, mock_analyze):
+        """Test a double-submitted conversation runs the graph once."""
+        async def slow_analysis(**kwargs):
+            await asyncio.sleep(0.05)
+            return {"action": "RESPOND"}
+
+        mock_analyze.side_effect = slow_analysis
+        body = {
+            "messages": [{"sender": "client", "content": "Did you file it?"}],
+            "client_info": {"client_id": "double_click_client"},
+        }
+
+        async def burst():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as ac:
+                return await asyncio.gather(
+                    *(ac.post("/api/v1/chat/analyze", json=body) for _ in range(3))
+                )
+
+        responses = asyncio.run(burst())
+        assert [r.status_code for r in responses] == [200] * 3
+        assert mock_analyze.await_count == 1
+
     def test_analyze_message_empty_messages(self):
         """Test analysis with empty messages."""
         test_data = {
@@ -85,6 +154,129 @@ class TestChatEndpoints:
         response = client.post("/api/v1/chat/analyze", json=test_data)
         assert response.status_code == 400
 
+    def test_analyze_malformed_body_matches_fastapi_validation(self):
+        """Test the raw-bytes body check answers like FastAPI's own."""
+        native = FastAPI()
+
+        @native.post("/analyze")
+        async def analyze(conversation: ConversationHistory):
+            return {}
+
+        native_client = TestClient(native)
+        for body in (
+            {"messages": "not a list", "client_info": {"client_id": "c1"}},
+            {"messages": []},
+            {"messages": [{"sender": "client"}], "client_info": {"client_id": "c1"}},
+        ):
+            response = client.post("/api/v1/chat/analyze", json=body)
+            expected = native_client.post("/analyze", json=body)
+            assert response.status_code == expected.status_code == 422
+            # same errors, fields and locations; only the wording may differ,
+            # since JSON-mode validation says "array" where Python says "list"
+            got, want = response.json()["detail"], expected.json()["detail"]
+            assert [(e.keys(), e["type"], e["loc"], e["input"]) for e in got] == [
+                (e.keys(), e["type"], e["loc"], e["input"]) for e in want
+            ]
+
+        response = client.post(
+            "/api/v1/chat/analyze", content=b"{not json", headers={"content-type": "application/json"}
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["type"] == "json_invalid"
+
+    def test_analyze_openapi_body_schema_is_inlined_and_valid(self):
+        """Test the /analyze body shows up in the docs as a valid schema."""
+        spec = app.openapi()
+        OpenAPI.model_validate(spec)
+        body = spec["paths"]["/api/v1/chat/analyze"]["post"]["requestBody"]
+        schema = body["content"]["application/json"]["schema"]
+        assert body["required"] is True
+        assert "$ref" not in json.dumps(schema)
+        assert set(schema["required"]) == {"messages", "client_info"}
+        assert schema["properties"]["messages"]["items"]["required"] == ["sender", "content"]
+
+    @patch('app.features.chat.services.ChatOrchestrator.analyze_message', new_callable=AsyncMock)
+    def test_analyze_etag_tracks_the_whole_request(self, mock_analyze):
+        """Test a repeat poll gets 304 and any change to its inputs a rerun."""
+        mock_analyze.return_value = {"action": "RESPOND", "sentiment": "Neutral"}
+        test_data = {
+            "messages": [
+                {"sender": "client", "content": "Hello", "timestamp": "2023-01-01T10:00:00Z"},
+                {"sender": "client", "content": "Any update?", "timestamp": "2023-01-01T10:05:00Z"},
+            ],
+            "client_info": {"client_id": "etag_client", "name": "Test Client"},
+        }
+
+        first = client.post("/api/v1/chat/analyze", json=test_data)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        repeat = client.post("/api/v1/chat/analyze", json=test_data, headers={"If-None-Match": etag})
+        assert repeat.status_code == 304
+        assert mock_analyze.await_count == 1
+
+        edited = {**test_data, "messages": [{**test_data["messages"][0], "content": "Hi"}, test_data["messages"][1]]}
+        response = client.post("/api/v1/chat/analyze", json=edited, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+        renamed = {**test_data, "client_info": {"client_id": "etag_client", "name": "New Name"}}
+        response = client.post("/api/v1/chat/analyze", json=renamed, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert mock_analyze.await_count == 3
+    @patch('app.features.chat.services.ChatOrchestrator.analyze_message', new_callable=AsyncMock)
+    def test_analyze_batch_keeps_order_and_isolates_failures(self, mock_analyze):
+        """Test batch analysis: one slot per conversation, errors in place."""
+        async def analyze(client_info, history):
+            client_id = client_info["client_id"]
+            if client_id == "bad_input":
+                raise ValueError("conversation history is empty")
+            if client_id == "broken":
+                raise RuntimeError("upstream key sk-123 rejected")
+            # earlier conversations finish last
+            await asyncio.sleep(0.01 * (3 - int(client_id[-1])))
+            return {"action": "RESPOND", "client_id": client_id, "last": history[-1]["content"]}
+
+        mock_analyze.side_effect = analyze
+
+        def conversation(client_id, *texts):
+            return {
+                "messages": [{"sender": "client", "content": t} for t in texts],
+                "client_info": {"client_id": client_id},
+            }
+
+        test_data = {
+            "conversations": [
+                conversation("client_1", "Hello"),
+                conversation("empty"),
+                conversation("client_2", "Any update?"),
+                conversation("bad_input", "Hi"),
+                conversation("broken", "Hi"),
+                conversation("client_3", "Thanks"),
+            ]
+        }
+
+        response = client.post("/api/v1/chat/analyze-batch", json=test_data)
+        assert response.status_code == 200
+        results = response.json()["data"]["results"]
+        assert [r.get("client_id") for r in results] == ["client_1", None, "client_2", None, None, "client_3"]
+        assert results[0]["last"] == "Hello"
+        assert results[1] == {"error": "no valid messages after sanitization"}
+        assert results[3] == {"error": "conversation history is empty"}
+        # anything but a ValueError is masked
+        assert results[4] == {"error": "analysis failed"}
+        assert mock_analyze.await_count == 5
+
+
+HIGH_LEVEL_DATA = {
+    "firm_name": "Smith & Co",
+    "admin_names": ["Ada"],
+    "report_period": "2023-Q1",
+    "analysis_date": "2023-04-01",
+    "firm_wide_data": {"cases": 12},
+    "user_performance_data": [{"user": "u1", "closed": 3}],
+}
+
 
 class TestInsightsEndpoints:
     """Test insights generation endpoints."""
@@ -113,6 +305,61 @@ class TestInsightsEndpoints:
         assert "insight" in data["data"]
 
 
+    @pytest.fixture
+    def report_log(self, monkeypatch):
+        from app.features.insights import routes
+
+        monkeypatch.setattr(routes, "_reports", LRUCache(maxsize=8))
+        emitted = []
+        monkeypatch.setattr(routes._high_level_log, "emit", lambda **fields: emitted.append(fields))
+        return emitted
+
+    @patch(
+        'app.features.insights.services.HighLevelInsightEngine.generate_high_level_insights',
+        new_callable=AsyncMock,
+    )
+    def test_high_level_repeat_gets_304_and_is_still_logged(self, mock_report, report_log):
+        """Test a repeated report request is served from its ETag."""
+        mock_report.return_value = "Quarterly report"
+        first = client.post("/api/v1/insights/high-level", json=HIGH_LEVEL_DATA)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        repeat = client.post(
+            "/api/v1/insights/high-level", json=HIGH_LEVEL_DATA, headers={"If-None-Match": etag}
+        )
+        assert repeat.status_code == 304
+        again = client.post("/api/v1/insights/high-level", json=HIGH_LEVEL_DATA)
+        assert again.json()["data"]["insights_report"] == "Quarterly report"
+
+        assert mock_report.await_count == 1
+        assert [e["cached"] for e in report_log] == [False, True, True]
+
+    @patch(
+        'app.features.insights.services.HighLevelInsightEngine.generate_high_level_insights',
+        new_callable=AsyncMock,
+    )
+    def test_high_level_concurrent_identical_requests_share_one_run(self, mock_report, report_log):
+        """Test identical reports asked for at once cost one engine call."""
+        async def slow_report(**kwargs):
+            await asyncio.sleep(0.05)
+            return "Quarterly report"
+
+        mock_report.side_effect = slow_report
+
+        async def burst():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as ac:
+                return await asyncio.gather(
+                    *(ac.post("/api/v1/insights/high-level", json=HIGH_LEVEL_DATA) for _ in range(5))
+                )
+
+        responses = asyncio.run(burst())
+        assert [r.status_code for r in responses] == [200] * 5
+        assert {r.json()["data"]["insights_report"] for r in responses} == {"Quarterly report"}
+        assert mock_report.await_count == 1
+        assert sorted(e["cached"] for e in report_log) == [False, True, True, True, True]
+
 class TestOutboundEndpoints:
     """Test outbound messaging endpoints."""
     
@@ -169,5 +416,18 @@ class TestErrorHandling:
         assert response.status_code == 200
 
 
+class TestTimestamps:
+    """Test response and health timestamps."""
+
+    def test_response_timestamps_are_utc(self):
+        """Response models default to a tz-aware UTC timestamp."""
+        for model in (BaseResponse(), ErrorResponse(error={})):
+            assert model.timestamp.utcoffset() == timedelta(0)
+
+    def test_health_timestamp_has_milliseconds(self):
+        """The health timestamp is ISO 8601 UTC to the millisecond."""
+        assert re.fullmatch(r"\S+T\d{2}:\d{2}:\d{2}\.\d{3}\+00:00", Settings.utc_now_iso())
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
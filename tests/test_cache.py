@@ -0,0 +1,101 @@
+"""Tests for the in-process caches."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.shared import cache
+from app.shared.cache import LRUCache, SingleFlight
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(t=100.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now.t))
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    c: LRUCache[str, int] = LRUCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a is now the most recent
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    assert len(c) == 2
+
+
+def test_lru_entries_expire_after_ttl(clock):
+    c: LRUCache[str, int] = LRUCache(maxsize=8, ttl_s=10)
+    c.set("a", 1)
+    clock.t += 9.9
+    assert c.get("a") == 1
+    clock.t += 0.1
+    assert c.get("a") is None
+    assert len(c) == 0
+
+
+def test_single_flight_shares_one_run_between_concurrent_callers():
+    flight: SingleFlight[str, int] = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main():
+        out = await asyncio.gather(*(flight.run("k", work) for _ in range(5)))
+        return out, len(flight)
+
+    out, inflight = asyncio.run(main())
+    assert out == [42] * 5
+    assert runs == [1]
+    # released once done: it dedupes, it doesn't cache
+    assert inflight == 0
+
+
+def test_single_flight_waiter_cancel_does_not_cancel_the_run():
+    flight: SingleFlight[str, str] = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.run("k", work))
+        second = asyncio.create_task(flight.run("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == ("done", True)
+
+
+def test_single_flight_passes_the_error_to_every_waiter():
+    flight: SingleFlight[str, str] = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.run("k", work) for _ in range(3)), return_exceptions=True
+        )
+
+    out = asyncio.run(main())
+    assert [type(e) for e in out] == [ValueError] * 3
+
+
+def test_lru_counts_hits_and_misses():
+    c: LRUCache[str, int] = LRUCache(maxsize=8)
+    c.set("a", 1)
+    c.get("a")
+    c.get("a")
+    c.get("missing")
+    assert c.stats() == {"size": 1, "hits": 2, "misses": 1}
@@ -1,7 +1,7 @@
 """End-to-end tests for the chat-analysis LangGraph.
 
-The graph nodes call DSPy modules under the hood; we monkeypatch each
-module's __call__ so the tests run without an LM.
+The graph nodes call DSPy modules under the hood; we monkeypatch the
+module-level singletons in chat_graph so the tests run without an LM.
 
 The graph is compiled with a checkpointer, so every invoke needs a
 config with a thread_id.
@@ -32,21 +32,21 @@ def patch_modules(monkeypatch):
     """
     from app.features.agent import chat_graph as cg
 
-    monkeypatch.setattr(cg._triage, "__call__", lambda m, **_: _ns(
+    monkeypatch.setattr(cg, "_triage", lambda m, **_: _ns(
         should_flag=False, should_respond=True, should_ignore=False, reasoning="auto",
     ))
-    monkeypatch.setattr(cg._sentiment, "__call__", lambda m, **_: _ns(
+    monkeypatch.setattr(cg, "_sentiment", lambda m, **_: _ns(
         sentiment="Positive", sentiment_score=20,
     ))
-    monkeypatch.setattr(cg._event, "__call__", lambda m, **_: _ns(
+    monkeypatch.setattr(cg, "_event", lambda m, **_: _ns(
         has_event=False, event_details=None, suggested_reminder=None, internal_note=None,
     ))
-    monkeypatch.setattr(cg._risk, "__call__", lambda m, ta, **_: _ns(
+    monkeypatch.setattr(cg, "_risk", lambda m, ta, **_: _ns(
         risk_update="Low", risk_score=10,
     ))
-    monkeypatch.setattr(cg._respond, "__call__", lambda **_: "thanks for reaching out")
+    monkeypatch.setattr(cg, "_respond", lambda **_: "thanks for reaching out")
     # critic accepts the draft; default to a passing score so no refine loop
-    monkeypatch.setattr(cg._critic, "__call__", lambda **_: _ns(score=90, notes=""))
+    monkeypatch.setattr(cg, "_critic", lambda **_: _ns(score=90, notes=""))
     return cg
 
 
@@ -61,7 +61,7 @@ def test_graph_full_pipeline_returns_reply(patch_modules):
 
 def test_graph_skips_on_ignore(patch_modules, monkeypatch):
     cg = patch_modules
-    monkeypatch.setattr(cg._triage, "__call__", lambda m, **_: _ns(
+    monkeypatch.setattr(cg, "_triage", lambda m, **_: _ns(
         should_flag=False, should_respond=False, should_ignore=True, reasoning="closer",
     ))
     state = asyncio.run(cg.chat_graph.ainvoke(
@@ -85,8 +85,8 @@ def test_graph_loops_on_low_critic_score(patch_modules, monkeypatch):
             return _ns(score=50, notes="too short")
         return _ns(score=90, notes="")
 
-    monkeypatch.setattr(cg._respond, "__call__", _respond)
-    monkeypatch.setattr(cg._critic, "__call__", _critic)
+    monkeypatch.setattr(cg, "_respond", _respond)
+    monkeypatch.setattr(cg, "_critic", _critic)
 
     state = asyncio.run(cg.chat_graph.ainvoke(
         {"message": "hi", "history": [], "client_info": {}}, config=_config(),
@@ -98,7 +98,7 @@ def test_graph_loops_on_low_critic_score(patch_modules, monkeypatch):
 
 def test_graph_bails_after_max_refine(patch_modules, monkeypatch):
     cg = patch_modules
-    monkeypatch.setattr(cg._critic, "__call__", lambda **_: _ns(score=10, notes="bad"))
+    monkeypatch.setattr(cg, "_critic", lambda **_: _ns(score=10, notes="bad"))
     state = asyncio.run(cg.chat_graph.ainvoke(
         {"message": "hi", "history": [], "client_info": {}}, config=_config(),
     ))
@@ -107,12 +107,86 @@ def test_graph_bails_after_max_refine(patch_modules, monkeypatch):
     assert state["reply"] is not None  # we keep the latest draft
 
 
+def test_graph_worst_case_fits_recursion_limit(patch_modules, monkeypatch):
+    cg = patch_modules
+    monkeypatch.setattr(cg, "_critic", lambda **_: _ns(score=10, notes="bad"))
+    # every refine taken: the tight step cap must still let the run finish
+    state = asyncio.run(cg.chat_graph.ainvoke(
+        {"message": "hi", "history": [], "client_info": {}},
+        config=cg.graph_config(f"t-{uuid.uuid4()}"),
+    ))
+    assert state["refine_count"] == cg.MAX_REFINE + 1
+
+
+def test_speculative_risk_reruns_only_when_flag_changes_it(patch_modules, monkeypatch):
+    cg = patch_modules
+    monkeypatch.setattr(cg, "_triage", lambda m, **_: _ns(
+        should_flag=True, should_respond=True, should_ignore=False, reasoning="injury",
+    ))
+    seen = []
+
+    def _risk(m, ta, **_):
+        seen.append(ta)
+        return _ns(risk_update="Low" if ta == "RESPOND" else "Medium", risk_score=50)
+
+    monkeypatch.setattr(cg, "_risk", _risk)
+    state = asyncio.run(cg.chat_graph.ainvoke(
+        {"message": "I fell again", "history": [], "client_info": {}}, config=_config(),
+    ))
+    # speculative pass assumed RESPOND; the FLAG made it rerun with real actions
+    assert seen == ["RESPOND", "FLAG, RESPOND"]
+    assert state["risk"]["risk_update"] == "Medium"
+
+
+def test_speculative_risk_kept_on_plain_respond(patch_modules, monkeypatch):
+    cg = patch_modules
+    seen = []
+
+    def _risk(m, ta, **_):
+        seen.append(ta)
+        return _ns(risk_update="Low", risk_score=10)
+
+    monkeypatch.setattr(cg, "_risk", _risk)
+    asyncio.run(cg.chat_graph.ainvoke(
+        {"message": "hi", "history": [], "client_info": {}}, config=_config(),
+    ))
+    assert seen == ["RESPOND"]
+
+
+def test_fused_graph_uses_single_analysis_call(patch_modules, monkeypatch):
+    cg = patch_modules
+    calls = {"fused": 0}
+
+    def _fused(m, **_):
+        calls["fused"] += 1
+        return _ns(
+            should_flag=False, should_respond=True, should_ignore=False, reasoning="auto",
+            risk_update="Low", risk_score=10, sentiment="Positive", sentiment_score=20,
+            has_event=False, event_details=None, suggested_reminder=None, internal_note=None,
+        )
+
+    def _unused(*_, **__):
+        raise AssertionError("per-task module called in fused mode")
+
+    monkeypatch.setattr(cg, "_fused", _fused)
+    for name in ("_triage", "_sentiment", "_event", "_risk"):
+        monkeypatch.setattr(cg, name, _unused)
+
+    graph = cg.build_chat_graph(fused=True)
+    state = asyncio.run(graph.ainvoke(
+        {"message": "hi", "history": [], "client_info": {}}, config=_config(),
+    ))
+    assert calls["fused"] == 1
+    assert state["risk"] == {"risk_update": "Low", "risk_score": 10}
+    assert state["reply"] == "thanks for reaching out"
+
+
 def test_graph_pauses_on_high_risk_flag(patch_modules, monkeypatch):
     cg = patch_modules
-    monkeypatch.setattr(cg._triage, "__call__", lambda m, **_: _ns(
+    monkeypatch.setattr(cg, "_triage", lambda m, **_: _ns(
         should_flag=True, should_respond=True, should_ignore=False, reasoning="urgent",
     ))
-    monkeypatch.setattr(cg._risk, "__call__", lambda m, ta, **_: _ns(
+    monkeypatch.setattr(cg, "_risk", lambda m, ta, **_: _ns(
         risk_update="High", risk_score=85,
     ))
 
@@ -131,3 +205,122 @@ def test_graph_pauses_on_high_risk_flag(patch_modules, monkeypatch):
     ))
     assert final["reply"] == "we are on it"
     assert final["human_decision"]["reviewer"] == "alice"
+
+
+class _StubSummarizer:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.chats = []
+
+    async def summarize_chat(self, chat):
+        self.chats.append(chat)
+        if self.fail:
+            raise RuntimeError("summary tier down")
+        return f"{len(chat['messages'])} earlier turns"
+
+
+def _turns(n):
+    return [{"sender": "client", "content": f"turn {i}"} for i in range(n)]
+
+
+def test_long_history_is_condensed_to_summary_plus_window(monkeypatch):
+    from app.features.agent import chat_graph as cg
+
+    summarizer = _StubSummarizer()
+    monkeypatch.setattr(cg, "_summarizer", summarizer)
+    out = asyncio.run(cg.condense_history(_turns(20)))
+
+    assert out[0] == {"role": "system", "content": "Prior context: 12 earlier turns"}
+    assert out[1:] == _turns(20)[-cg.HISTORY_WINDOW:]
+    # only the turns outside the window are summarized
+    assert summarizer.chats[0]["messages"][-1] == {"sender": "client", "text": "turn 11"}
+
+
+def test_short_history_is_passed_through_without_a_summary(monkeypatch):
+    from app.features.agent import chat_graph as cg
+
+    summarizer = _StubSummarizer()
+    monkeypatch.setattr(cg, "_summarizer", summarizer)
+    history = _turns(cg.HISTORY_WINDOW)
+    assert asyncio.run(cg.condense_history(history)) == history
+    assert summarizer.chats == []
+
+
+def test_failed_summary_still_keeps_the_window(monkeypatch):
+    from app.features.agent import chat_graph as cg
+
+    monkeypatch.setattr(cg, "_summarizer", _StubSummarizer(fail=True))
+    assert asyncio.run(cg.condense_history(_turns(20))) == _turns(20)[-cg.HISTORY_WINDOW:]
+
+
+def test_orchestrator_puts_condensed_history_in_graph_state(patch_modules, monkeypatch):
+    from app.features.chat.services import ChatOrchestrator
+
+    cg = patch_modules
+    monkeypatch.setattr(cg, "_summarizer", _StubSummarizer())
+    orch = ChatOrchestrator()
+    history = _turns(20)
+    result = asyncio.run(orch.analyze_message({"client_id": f"c-{uuid.uuid4()}"}, history))
+    state = asyncio.run(cg.chat_graph.aget_state(cg.graph_config(result["thread_id"])))
+    assert state.values["history"][0]["content"] == "Prior context: 12 earlier turns"
+    assert len(state.values["history"]) == cg.HISTORY_WINDOW + 1
+
+
+def test_failed_sentiment_and_event_fall_back_without_failing_run(patch_modules, monkeypatch):
+    cg = patch_modules
+
+    def _boom(m, **_):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(cg, "_sentiment", _boom)
+    monkeypatch.setattr(cg, "_event", _boom)
+    state = asyncio.run(cg.chat_graph.ainvoke(
+        {"message": "hi", "history": [], "client_info": {}}, config=_config(),
+    ))
+    assert state["sentiment"] == {"sentiment": "Neutral", "sentiment_score": 50}
+    assert state["event"]["has_event"] is False
+    # the real triage / risk still decide the route
+    assert state["reply"] == "thanks for reaching out"
+
+
+def test_failed_triage_still_fails_run(patch_modules, monkeypatch):
+    cg = patch_modules
+
+    def _boom(m, **_):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(cg, "_triage", _boom)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cg.chat_graph.ainvoke(
+            {"message": "hi", "history": [], "client_info": {}}, config=_config(),
+        ))
+
+
+def test_concurrent_runs_on_same_message_share_analysis_calls(patch_modules, monkeypatch):
+    import threading
+
+    cg = patch_modules
+    calls = {"triage": 0}
+    release = threading.Event()
+
+    def _triage(m, **_):
+        calls["triage"] += 1
+        release.wait(1)  # hold the call open so the second run piles onto it
+        return _ns(should_flag=False, should_respond=True, should_ignore=False, reasoning="auto")
+
+    monkeypatch.setattr(cg, "_triage", _triage)
+
+    async def both():
+        runs = [
+            asyncio.create_task(cg.chat_graph.ainvoke(
+                {"message": "thanks", "history": [], "client_info": {}}, config=_config(),
+            ))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.2)
+        release.set()
+        return await asyncio.gather(*runs)
+
+    states = asyncio.run(both())
+    assert calls["triage"] == 1
+    assert all(s["triage"]["should_respond"] for s in states)
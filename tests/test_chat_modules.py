@@ -8,10 +8,13 @@ from __future__ import annotations
 
 import asyncio
 import json
+import threading
 
 import dspy
+import litellm
 import pytest
 
+from app.features.chat import services
 from app.features.chat.services import (
     ChatOrchestrator,
     EventModule,
@@ -19,6 +22,8 @@ from app.features.chat.services import (
     SentimentModule,
     TriageModule,
 )
+from app.features.chat.summarization import ChatSummarizer
+from app.features.chat.text_processing import TextProcessor
 
 
 class _DummyLM(dspy.LM):
@@ -70,26 +75,310 @@ def test_risk_score_clamped():
     assert 0 <= out.risk_score <= 100
 
 
-def test_sentiment_score_clamped():
+def _fast_tier(monkeypatch, lm: dspy.LM) -> list[str]:
+    """Route services.get_lm to the dummy; returns the tiers asked for."""
+    tiers: list[str] = []
+
+    def fake_get_lm(tier="main", **kwargs):
+        tiers.append(tier)
+        return lm
+
+    monkeypatch.setattr(services, "get_lm", fake_get_lm)
+    return tiers
+
+
+def test_sentiment_score_clamped(monkeypatch):
     lm = _DummyLM({"sentiment": "Neutral", "sentiment_score": -50})
-    dspy.configure(lm=lm)
+    tiers = _fast_tier(monkeypatch, lm)
     out = SentimentModule()(message="meh")
     assert 0 <= out.sentiment_score <= 100
+    assert tiers == ["fast"]
 
 
-def test_event_passthrough_when_no_event():
+def test_event_passthrough_when_no_event(monkeypatch):
     lm = _DummyLM({
         "has_event": False,
         "event_details": None,
         "suggested_reminder": None,
         "internal_note": None,
     })
-    dspy.configure(lm=lm)
+    tiers = _fast_tier(monkeypatch, lm)
     out = EventModule()(message="just checking in")
     assert out.has_event is False
+    assert tiers == ["fast"]
 
 
 def test_orchestrator_rejects_empty_history():
     orch = ChatOrchestrator()
     with pytest.raises(ValueError):
         asyncio.run(orch.analyze_message({"client_id": "c1"}, []))
+
+
+def test_analyze_batch_runs_one_clients_conversations_in_turn():
+    orchestrator = ChatOrchestrator()
+    active: dict[str, int] = {}
+    overlapped = []
+    order = []
+
+    async def analyze(client_info, history):
+        client_id = client_info["client_id"]
+        active[client_id] = active.get(client_id, 0) + 1
+        overlapped.append(sum(active.values()) > 1)
+        if active[client_id] > 1:
+            raise AssertionError(f"{client_id} ran twice at once on one thread")
+        await asyncio.sleep(0.01)
+        active[client_id] -= 1
+        order.append(history[-1]["content"])
+        if history[-1]["content"] == "bad":
+            raise ValueError("current message is empty")
+        return {"client_id": client_id, "last": history[-1]["content"]}
+
+    orchestrator.analyze_message = analyze
+    client_infos = [{"client_id": c} for c in ("a", "b", "a", "a")]
+    histories = [[{"content": t}] for t in ("a1", "b1", "bad", "a3")]
+    out = asyncio.run(orchestrator.analyze_batch(client_infos, histories))
+
+    assert [r["last"] if isinstance(r, dict) else "error" for r in out] == ["a1", "b1", "error", "a3"]
+    assert isinstance(out[2], ValueError)
+    # a's conversations keep their order; b ran alongside them
+    assert [t for t in order if t != "b1"] == ["a1", "bad", "a3"]
+    assert any(overlapped)
+
+
+def test_cached_json_adapter_reuses_signature_prompt():
+    from app.core.llm import CachedJSONAdapter
+
+    lm = _DummyLM({
+        "should_flag": True,
+        "should_respond": False,
+        "should_ignore": False,
+        "reasoning": "asks for a lawyer",
+    })
+    adapter = CachedJSONAdapter()
+    dspy.configure(lm=lm, adapter=adapter)
+    try:
+        first = TriageModule()(message="can I talk to my lawyer?")
+        second = TriageModule()(message="call me please")
+    finally:
+        dspy.configure(adapter=None)
+    assert first.should_flag and second.should_flag
+    assert adapter._system_message.cache_info().hits == 1
+
+
+def test_batch_triage_one_validated_decision_per_message():
+    lm = _DummyLM({"decisions": [
+        {"should_flag": False, "should_respond": True, "should_ignore": True, "reasoning": "both"},
+        {"should_flag": False, "should_respond": False, "should_ignore": False, "reasoning": "none"},
+        {"should_flag": False, "should_respond": False, "should_ignore": True, "reasoning": "closer"},
+    ]})
+    dspy.configure(lm=lm)
+    orch = ChatOrchestrator()
+    out = asyncio.run(orch.triage_batch(["a? and ok", "hmm", "thanks"]))
+    assert [r["actions"] for r in out] == [["RESPOND"], ["FLAG"], ["IGNORE"]]
+
+
+def test_batch_triage_failed_chunk_falls_back_per_message_and_keeps_others():
+    from app.features.chat.services import BatchTriageModule
+    from app.features.chat.signatures import TriageDecision
+
+    def _predict(messages):
+        if "boom" in messages:
+            raise ValueError("reply did not match the signature")
+        return dspy.Prediction(decisions=[
+            TriageDecision(should_flag=False, should_respond=True, should_ignore=False, reasoning="batch")
+            for _ in messages
+        ])
+
+    singles = []
+
+    def _single(message):
+        singles.append(message)
+        return dspy.Prediction(should_flag=True, should_respond=False, should_ignore=False, reasoning="single")
+
+    module = BatchTriageModule(batch_size=2)
+    module.predict = _predict
+    module.single = _single
+    out = module(messages=["hi", "ok", "boom", "later"])
+    assert [d.reasoning for d in out] == ["batch", "batch", "single", "single"]
+    assert singles == ["boom", "later"]
+
+
+@pytest.fixture
+def fresh_text_cache(monkeypatch):
+    from app.features.chat import text_processing
+    from app.shared.cache import LRUCache
+
+    monkeypatch.setattr(text_processing, "_results", LRUCache(maxsize=256))
+
+
+def test_urgency_batch_sends_only_uncached_texts_in_chunks(fresh_text_cache):
+    batches = []
+
+    def _batch(texts):
+        batches.append(texts)
+        return dspy.Prediction(urgencies=["High" if "court" in t else "Low" for t in texts])
+
+    proc = TextProcessor()
+    proc._urgency_batch = _batch
+    texts = [f"question {i}" for i in range(25)] + ["court date moved"]
+    out = asyncio.run(proc.classify_urgency_batch(texts))
+    assert out == ["Low"] * 25 + ["High"]
+    assert [len(b) for b in batches] == [20, 6]
+
+    # all answered now; a repeat never reaches the LM
+    again = asyncio.run(proc.classify_urgency_batch(["court date moved", "question 3"]))
+    assert again == ["High", "Low"]
+    assert len(batches) == 2
+
+
+def test_urgency_batch_mismatch_redoes_chunk_per_text(fresh_text_cache):
+    singles = []
+
+    def _single(text):
+        singles.append(text)
+        return dspy.Prediction(urgency="Medium")
+
+    proc = TextProcessor()
+    proc._urgency_batch = lambda texts: dspy.Prediction(urgencies=["Low"])
+    proc._urgency = _single
+    out = asyncio.run(proc.classify_urgency_batch(["question a", "question b"]))
+    assert out == ["Medium", "Medium"]
+    assert singles == ["question a", "question b"]
+
+
+def test_urgency_batch_failure_answers_medium(fresh_text_cache):
+    def _boom(texts):
+        raise ValueError("reply did not match the signature")
+
+    proc = TextProcessor()
+    proc._urgency_batch = _boom
+    assert asyncio.run(proc.classify_urgency_batch(["question a"])) == ["Medium"]
+
+
+@pytest.mark.parametrize(
+    ("text", "label"),
+    [
+        ("Please call me ASAP about the filing", "High"),
+        ("This is an emergency, they served papers", "High"),
+        ("No rush, just send it whenever", "Low"),
+        ("FYI the hearing notes are attached", "Low"),
+    ],
+)
+def test_urgency_cue_tags_without_the_lm(fresh_text_cache, text, label):
+    proc = TextProcessor()
+    proc._urgency = lambda **_: pytest.fail("called the LM for a clear cue")
+    proc._urgency_batch = lambda **_: pytest.fail("called the LM for a clear cue")
+    assert asyncio.run(proc.classify_urgency(text)) == label
+    assert asyncio.run(proc.classify_urgency_batch([text])) == [label]
+
+
+def test_urgency_mixed_or_missing_cues_go_to_the_fast_tier(fresh_text_cache):
+    proc = TextProcessor()
+    proc._lm = _DummyLM({"urgency": "Low"})
+    proc._fast_lm = _DummyLM({"urgency": "High"})
+    # "urgent" and "no rush" pull both ways, so the cue can't decide
+    assert asyncio.run(proc.classify_urgency("Not urgent, no rush on the draft")) == "High"
+    assert asyncio.run(proc.classify_urgency("Where are we on the settlement?")) == "High"
+
+
+def _chat(*texts):
+    return {"messages": [{"sender": "client", "text": t} for t in texts]}
+
+
+def test_summary_of_a_repeated_chat_comes_from_the_cache():
+    summarizer = ChatSummarizer()
+    calls = []
+
+    def predict(chat_log):
+        calls.append(chat_log)
+        return dspy.Prediction(summary="Chat Summary: first pass ")
+
+    summarizer._predict = predict
+    summarizer._extend = lambda **_: pytest.fail("extended an unchanged chat")
+    chat = _chat("hi", "any news on my case?")
+    assert asyncio.run(summarizer.summarize_chat(chat)) == "Chat Summary: first pass"
+    assert asyncio.run(summarizer.summarize_chat(chat)) == "Chat Summary: first pass"
+    assert calls == ["client: hi\nclient: any news on my case?"]
+
+
+def test_summary_of_a_grown_chat_extends_with_only_the_new_lines():
+    summarizer = ChatSummarizer()
+    extend_calls = []
+
+    def extend(previous_summary, new_lines):
+        extend_calls.append((previous_summary, new_lines))
+        return dspy.Prediction(summary="Chat Summary: extended")
+
+    summarizer._predict = lambda chat_log: dspy.Prediction(summary="Chat Summary: first pass")
+    summarizer._extend = extend
+    asyncio.run(summarizer.summarize_chat(_chat("hi", "any news on my case?")))
+    out = asyncio.run(summarizer.summarize_chat(_chat("hi", "any news on my case?", "thanks", "call me")))
+    assert out == "Chat Summary: extended"
+    assert extend_calls == [("Chat Summary: first pass", "client: thanks\nclient: call me")]
+
+
+def test_text_breaker_opens_after_repeated_failures_and_falls_back():
+    calls = []
+
+    def _boom(**kwargs):
+        calls.append(kwargs)
+        raise litellm.ServiceUnavailableError("provider down", llm_provider="openai", model="gpt-4o")
+
+    proc = TextProcessor()
+    proc._concise = _boom
+
+    async def _run():
+        return [await proc.make_concise(f"please review the attached draft {i}") for i in range(6)]
+
+    out = asyncio.run(_run())
+    assert out == ["please review the attached"] * 6
+    # five failures open the breaker; the sixth never reaches the LM
+    assert len(calls) == 5
+    assert proc._breakers["concise"].state == "open"
+
+
+def test_text_breaker_ignores_non_transient_errors():
+    def _unparseable(**kwargs):
+        raise ValueError("reply did not match the signature")
+
+    proc = TextProcessor()
+    proc._urgency = _unparseable
+
+    async def _run():
+        return [await proc.classify_urgency(f"call me about the hearing {i}") for i in range(6)]
+
+    assert asyncio.run(_run()) == ["Medium"] * 6
+    assert proc._breakers["urgency"].state == "closed"
+
+
+def test_text_call_timeout_keeps_its_slot_until_the_thread_returns():
+    release = threading.Event()
+
+    def _stuck(**kwargs):
+        release.wait(5)
+        return dspy.Prediction(concise="late reply")
+
+    proc = TextProcessor()
+    proc._concise = _stuck
+    proc._slots = asyncio.Semaphore(1)
+    proc._timeout_s = 0.01
+
+    async def _run():
+        # times out into the local fallback, but the LM call is still running
+        out = await proc.make_concise("please review the attached draft")
+        held = proc._slots.locked()
+        release.set()
+        while proc._slots.locked():
+            await asyncio.sleep(0.01)
+        return out, held
+
+    out, held = asyncio.run(_run())
+    assert out == "please review the attached"
+    assert held
+
+
+def test_keywords_keep_commas_inside_a_term():
+    proc = TextProcessor()
+    proc._fast_lm = _DummyLM({"keywords": ["Smith, Jones & Co", " custody ", "", "deadline"]})
+    out = asyncio.run(proc.extract_keywords("Smith, Jones & Co missed the custody deadline", max_keywords=2))
+    assert out == ["Smith, Jones & Co", "custody"]
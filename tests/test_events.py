@@ -0,0 +1,105 @@
+"""Tests for the batched log events.
+
+The module logger is swapped for a recorder, and the batcher registry for
+an empty list so test batchers don't join the app's.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.shared import events
+from app.shared.events import EventBatcher
+
+
+class _RecordingLogger:
+    def __init__(self):
+        self.lines: list[tuple[str, dict]] = []
+
+    def info(self, event, **fields):
+        self.lines.append((event, fields))
+
+
+@pytest.fixture
+def log(monkeypatch):
+    recorder = _RecordingLogger()
+    monkeypatch.setattr(events, "logger", recorder)
+    monkeypatch.setattr(events, "_batchers", [])
+    return recorder
+
+
+def test_emit_logs_inline_before_start(log):
+    batcher = EventBatcher("thing_logged")
+    batcher.emit(client_id="c1")
+    assert log.lines == [("thing_logged", {"client_id": "c1"})]
+
+
+def test_flushes_when_batch_is_full(log):
+    async def main():
+        batcher = EventBatcher("thing_logged", batch_size=3, flush_interval_s=60)
+        batcher.start()
+        for i in range(3):
+            batcher.emit(n=i)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        flushed = list(log.lines)
+        await batcher.stop()
+        return flushed
+
+    flushed = asyncio.run(main())
+    assert flushed == [
+        ("thing_logged", {"count": 3, "dropped": 0, "events": [{"n": 0}, {"n": 1}, {"n": 2}]})
+    ]
+
+
+def test_flushes_a_partial_batch_after_the_interval(log):
+    async def main():
+        batcher = EventBatcher("thing_logged", batch_size=50, flush_interval_s=0.01)
+        batcher.start()
+        batcher.emit(n=0)
+        batcher.emit(n=1)
+        await asyncio.sleep(0.05)
+        flushed = list(log.lines)
+        await batcher.stop()
+        return flushed
+
+    flushed = asyncio.run(main())
+    assert flushed == [("thing_logged", {"count": 2, "dropped": 0, "events": [{"n": 0}, {"n": 1}]})]
+
+
+def test_full_queue_drops_and_counts(log):
+    async def main():
+        batcher = EventBatcher("thing_logged", maxsize=2)
+        batcher.start()
+        # no await in between: the drain task hasn't taken anything yet
+        for i in range(5):
+            batcher.emit(n=i)
+        dropped = batcher.dropped
+        await batcher.stop()
+        return dropped
+
+    assert asyncio.run(main()) == 3
+    # the count goes out with the next flush and is reset
+    assert log.lines == [
+        ("thing_logged", {"count": 2, "dropped": 3, "events": [{"n": 0}, {"n": 1}]})
+    ]
+
+
+def test_stop_drains_everything_emitted(log):
+    async def main():
+        batcher = EventBatcher("thing_logged", batch_size=50, flush_interval_s=60)
+        batcher.start()
+        batcher.emit(n=0)
+        # let the drain task take the first event and wait for more
+        for _ in range(5):
+            await asyncio.sleep(0)
+        batcher.emit(n=1)
+        await batcher.stop()
+        # stopped: back to logging inline
+        batcher.emit(n=2)
+
+    asyncio.run(main())
+    flushed = [e for _, fields in log.lines for e in fields.get("events", [fields])]
+    assert flushed == [{"n": 0}, {"n": 1}, {"n": 2}]
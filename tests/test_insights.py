@@ -0,0 +1,254 @@
+"""Tests for the micro insight engine.
+
+The engine's predictors are swapped for plain callables on the instance,
+and its module-level caches for fresh ones, so nothing reaches an LM and
+tests don't see each other's results.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import get_settings
+from app.features.insights import services
+from app.features.insights.services import HighLevelInsightEngine, MicroInsightEngine
+from app.shared.cache import LRUCache
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches(monkeypatch):
+    monkeypatch.setattr(services, "_sentiments", LRUCache(maxsize=64))
+    monkeypatch.setattr(services, "_insights", LRUCache(maxsize=64))
+    monkeypatch.setattr(services, "_fused", LRUCache(maxsize=64))
+
+
+def _recording(fn):
+    calls = []
+
+    def wrapper(**kwargs):
+        calls.append(kwargs)
+        return fn(**kwargs)
+
+    wrapper.calls = calls
+    return wrapper
+
+
+def _label_for(text: str) -> str:
+    return "Negative" if "awful" in text else "Positive"
+
+
+def test_sentiment_batch_serves_cached_texts_without_the_lm():
+    engine = MicroInsightEngine()
+    engine._classify_batch = _recording(
+        lambda texts: SimpleNamespace(sentiments=[_label_for(t) for t in texts])
+    )
+    first = asyncio.run(engine.classify_sentiment_batch(["great thanks", "this is awful"]))
+    # same texts up to case and spacing: all cached
+    again = asyncio.run(engine.classify_sentiment_batch(["Great  Thanks", "this is awful"]))
+    assert first == again == ["Positive", "Negative"]
+    assert [c["texts"] for c in engine._classify_batch.calls] == [["great thanks", "this is awful"]]
+
+
+def test_sentiment_batch_length_mismatch_redoes_chunk_per_text():
+    engine = MicroInsightEngine()
+    engine._classify_batch = lambda texts: SimpleNamespace(sentiments=["Positive"])
+    engine._classify = _recording(lambda text: SimpleNamespace(sentiment=_label_for(text)))
+    out = asyncio.run(engine.classify_sentiment_batch(["great thanks", "this is awful"]))
+    assert out == ["Positive", "Negative"]
+    assert len(engine._classify.calls) == 2
+
+
+def test_sentiment_batch_failure_redoes_chunk_per_text():
+    def _boom(texts):
+        raise ValueError("reply did not match the signature")
+
+    engine = MicroInsightEngine()
+    engine._classify_batch = _boom
+    engine._classify = _recording(lambda text: SimpleNamespace(sentiment=_label_for(text)))
+    out = asyncio.run(engine.classify_sentiment_batch(["great thanks", "this is awful"]))
+    assert out == ["Positive", "Negative"]
+    assert len(engine._classify.calls) == 2
+
+
+def _observing(label):
+    async def classify(text):
+        return label
+
+    return classify
+
+
+@pytest.mark.parametrize(
+    ("previous", "observed", "expected"),
+    [
+        ("Positive", "Positive", "Positive"),
+        ("Positive", "Neutral", "Neutral"),
+        ("Positive", "Negative", "Neutral"),
+        ("Neutral", "Positive", "Positive"),
+        ("Neutral", "Neutral", "Neutral"),
+        ("Neutral", "Negative", "Negative"),
+        ("Negative", "Positive", "Neutral"),
+        ("Negative", "Neutral", "Neutral"),
+        ("Negative", "Negative", "Negative"),
+        # nothing to reconcile with: the reading is taken as is
+        (None, "Positive", "Positive"),
+        (None, "Neutral", "Neutral"),
+        (None, "Negative", "Negative"),
+    ],
+)
+def test_adjust_sentiment(previous, observed, expected):
+    engine = MicroInsightEngine()
+    engine.classify_sentiment = _observing(observed)
+    messages = [{"body": "thanks for the update"}]
+    assert asyncio.run(engine.adjust_sentiment(previous, messages)) == expected
+
+
+@pytest.mark.parametrize("previous", ["Positive", "Negative", None])
+def test_adjust_sentiment_without_text_keeps_previous(previous):
+    async def classify(text):
+        raise AssertionError("classified empty text")
+
+    engine = MicroInsightEngine()
+    engine.classify_sentiment = classify
+    messages = [{"body": "  "}, {"content": ""}, {}]
+    assert asyncio.run(engine.adjust_sentiment(previous, messages)) == (previous or "Neutral")
+
+
+def test_run_many_keeps_job_order_and_caps_concurrency(monkeypatch):
+    monkeypatch.setattr(services, "within_budget", lambda messages: messages)
+    active = peak = 0
+    seen = []
+
+    async def fake_run(client_id, client_profile, messages, **_):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        # later jobs finish first, so order can only come from gather
+        await asyncio.sleep(0.001 * (30 - int(client_id)))
+        active -= 1
+        seen.append(messages)
+        return f"insight {client_id}"
+
+    engine = MicroInsightEngine()
+    engine.run_micro_insight_engine = fake_run
+    jobs = [
+        {
+            "client_id": str(i),
+            "client_profile": {},
+            "messages": [
+                {"sender": "client", "content": "  hi  "},
+                {"sender": "client", "content": "   "},
+            ],
+        }
+        for i in range(30)
+    ]
+    out = asyncio.run(engine.run_many(jobs))
+
+    assert out == [f"insight {i}" for i in range(30)]
+    assert peak == get_settings().INSIGHT_MAX_CONCURRENCY
+    # sanitized like /micro: blank messages dropped, text kept once under "body"
+    assert all(m == [{"timestamp": None, "sender": "client", "body": "hi"}] for m in seen)
+
+
+def test_run_many_caps_each_client_to_the_newest_messages(monkeypatch):
+    monkeypatch.setattr(services, "within_budget", lambda messages: messages)
+    seen = []
+
+    async def fake_run(messages, **_):
+        seen.append([m["body"] for m in messages])
+        return ""
+
+    engine = MicroInsightEngine()
+    engine.run_micro_insight_engine = fake_run
+    history = [{"content": f"message {i}"} for i in range(services._MAX_MESSAGES + 5)]
+    asyncio.run(engine.run_many([{"client_id": "1", "client_profile": {}, "messages": history}]))
+    assert seen == [[f"message {i}" for i in range(5, services._MAX_MESSAGES + 5)]]
+
+
+def test_run_many_bad_job_gets_the_fallback_and_spares_the_rest(monkeypatch):
+    def budget(messages):
+        if any("tokenizer" in m["body"] for m in messages):
+            raise RuntimeError("tokenizer unavailable")
+        return messages
+
+    monkeypatch.setattr(services, "within_budget", budget)
+
+    async def fake_run(client_id, messages, **_):
+        return f"insight {client_id}"
+
+    engine = MicroInsightEngine()
+    engine.run_micro_insight_engine = fake_run
+    jobs = [
+        {"client_id": "1", "client_profile": {}, "messages": [{"content": "hi"}]},
+        # no messages at all
+        {"client_id": "2", "client_profile": {}, "previous_sentiment": "Negative"},
+        # a message that isn't a dict
+        {"client_id": "3", "client_profile": {}, "messages": ["hi"]},
+        {"client_id": "4", "client_profile": {}, "messages": [{"content": "tokenizer breaks"}]},
+        {"client_id": "5", "client_profile": {}, "messages": [{"content": "thanks"}]},
+    ]
+    out = asyncio.run(engine.run_many(jobs))
+
+    fallback = "Recent client interaction requires review."
+    assert out[0] == "insight 1"
+    assert out[1] == f"Sentiment: Negative — {fallback}"
+    assert out[2] == out[3] == f"Sentiment: Neutral — {fallback}"
+    assert out[4] == "insight 5"
+
+
+def _two_call_engine():
+    engine = MicroInsightEngine()
+    engine._fused_enabled = True
+    engine._classify = _recording(lambda text: SimpleNamespace(sentiment="Negative"))
+    engine._insight = _recording(lambda **_: SimpleNamespace(insight="Client wants a call back"))
+    return engine
+
+
+def _run_micro(engine, previous_sentiment=None):
+    return asyncio.run(
+        engine.run_micro_insight_engine(
+            client_id="c1",
+            client_profile={"name": "Ada"},
+            messages=[{"sender": "client", "body": "still waiting on the filing"}],
+            previous_sentiment=previous_sentiment,
+        )
+    )
+
+
+def test_micro_fused_path_answers_in_one_call():
+    engine = _two_call_engine()
+    engine._fused = _recording(
+        lambda **_: SimpleNamespace(sentiment="Negative", insight="Client is frustrated")
+    )
+    # a swing from Positive only reaches Neutral, as in adjust_sentiment
+    assert _run_micro(engine, "Positive") == "Sentiment: Neutral — Client is frustrated."
+    assert len(engine._fused.calls) == 1
+    assert engine._classify.calls == engine._insight.calls == []
+
+
+def test_micro_fused_failure_falls_back_to_two_calls():
+    def _boom(**_):
+        raise ValueError("reply did not match the signature")
+
+    engine = _two_call_engine()
+    engine._fused = _boom
+    assert _run_micro(engine, "Neutral") == "Sentiment: Negative — Client wants a call back."
+    assert len(engine._classify.calls) == 1
+    assert engine._insight.calls[0]["current_sentiment"] == "Negative"
+
+
+def test_reports_run_on_their_own_pool_until_closed():
+    engine = HighLevelInsightEngine()
+
+    async def run():
+        name = await engine._call(lambda: threading.current_thread().name)
+        await engine.aclose()
+        return name
+
+    assert asyncio.run(run()).startswith("report")
+    # closed: nothing more is accepted
+    with pytest.raises(RuntimeError):
+        engine._executor.submit(lambda: None)
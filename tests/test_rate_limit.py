@@ -0,0 +1,113 @@
+"""Tests for the per-process deny / budget cache in front of the limiter.
+
+The wrapped strategy is a fake that records every hit and answers from a
+flag, and time.time is pinned, so expiry is driven by the test.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from limits import parse
+from limits.storage import RedisStorage
+from slowapi.util import get_remote_address
+
+from app.core import rate_limit
+from app.core.rate_limit import CachedLimiter, _LocallyCachedStrategy
+
+NOW = 1_000.0
+
+
+class _FakeStrategy:
+    def __init__(self, allow=True, reset_time=NOW + 60):
+        self.allow = allow
+        self.reset_time = reset_time
+        self.hits: list[int] = []
+
+    def hit(self, item, *identifiers, cost=1):
+        self.hits.append(cost)
+        return self.allow(cost) if callable(self.allow) else self.allow
+
+    def get_window_stats(self, item, *identifiers):
+        return SimpleNamespace(reset_time=self.reset_time, remaining=0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(t=NOW)
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: now.t))
+    return now
+
+
+ITEM = parse("5/minute")
+
+
+def test_denied_key_is_cached_until_reset(clock):
+    inner = _FakeStrategy(allow=False)
+    strategy = _LocallyCachedStrategy(inner, budget=1)
+    assert strategy.hit(ITEM, "client") is False
+    assert inner.hits == [1]
+
+    clock.t = NOW + 59
+    assert strategy.hit(ITEM, "client") is False
+    assert inner.hits == [1]
+
+    clock.t = NOW + 60
+    inner.allow = True
+    assert strategy.hit(ITEM, "client") is True
+    assert inner.hits == [1, 1]
+
+
+def test_reservation_is_spent_locally_then_expires(clock):
+    inner = _FakeStrategy()
+    strategy = _LocallyCachedStrategy(inner, budget=3)
+    assert all(strategy.hit(ITEM, "client") for _ in range(3))
+    assert inner.hits == [3]
+
+    # used up: the next hit reserves again
+    assert strategy.hit(ITEM, "client") is True
+    assert inner.hits == [3, 3]
+
+    # the rest of that reservation lapses with the window
+    clock.t = NOW + ITEM.get_expiry()
+    assert strategy.hit(ITEM, "client") is True
+    assert inner.hits == [3, 3, 3]
+
+
+def test_failed_reservation_falls_back_to_a_single_hit(clock):
+    inner = _FakeStrategy(allow=lambda cost: cost == 1)
+    strategy = _LocallyCachedStrategy(inner, budget=3)
+    assert strategy.hit(ITEM, "client") is True
+    assert inner.hits == [3, 1]
+    # nothing was reserved, so the next check goes back to the store
+    assert strategy.hit(ITEM, "client") is True
+    assert inner.hits == [3, 1, 3, 1]
+
+
+def test_preload_scripts_loads_every_storage_script(monkeypatch):
+    # redis-py connects lazily, so nothing here reaches a server
+    storage = RedisStorage("redis://localhost:6379")
+    loaded: list[str] = []
+    conn = SimpleNamespace(script_load=loaded.append)
+    monkeypatch.setattr(storage, "get_connection", lambda readonly=False: conn)
+    limiter = CachedLimiter(key_func=get_remote_address, storage_uri="memory://")
+    assert limiter.preload_scripts() == 0
+
+    limiter._storage = storage
+    assert limiter.preload_scripts() == len(loaded) > 0
+    assert sorted(loaded) == sorted(
+        v.script for k, v in vars(storage).items() if k.startswith("lua_")
+    )
+
+
+def test_sweep_drops_only_expired_entries(clock):
+    strategy = _LocallyCachedStrategy(_FakeStrategy(), budget=3)
+    strategy.hit(ITEM, "allowed")
+    strategy.inner.allow = False
+    strategy.hit(ITEM, "denied")
+
+    assert strategy.sweep(now=NOW + 30) == 0
+    assert strategy.sweep(now=NOW + 60) == 2
+    assert strategy._deny_until == {}
+    assert strategy._local_budget == {}
@@ -0,0 +1,40 @@
+"""Tests for the shared request-handling helpers."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.shared.utils import sanitize_recent, sanitize_text, sanitize_texts
+
+
+@pytest.mark.parametrize(
+    ("raw", "clean"),
+    [
+        ("  plain text  ", "plain text"),
+        # C0 controls and DEL are stripped anywhere in the text
+        ("null\x00byte", "nullbyte"),
+        ("\x1b[31mred\x1b[0m", "[31mred[0m"),
+        ("bell\x07 and del\x7f", "bell and del"),
+        # tab, newline and carriage return are layout, not noise
+        ("line one\nline two", "line one\nline two"),
+        ("col\tcol", "col\tcol"),
+        ("windows\r\nline", "windows\r\nline"),
+        ("\x00\x01\x02", ""),
+        (None, ""),
+        ("", ""),
+    ],
+)
+def test_sanitize_strips_control_characters_but_keeps_layout(raw, clean):
+    assert sanitize_text(raw) == clean
+    assert sanitize_texts([raw]) == [clean]
+
+
+def test_sanitize_truncates_past_max_length():
+    assert sanitize_text("abcdef", max_length=3) == "abc..."
+    assert sanitize_texts(["abcdef", "ab"], max_length=3) == ["abc...", "ab"]
+
+
+def test_sanitize_recent_keeps_the_newest_non_empty_texts():
+    texts = ["first", "  ", "second", "\x00", "third"]
+    assert sanitize_recent(texts, limit=2) == [(2, "second"), (4, "third")]
+    assert sanitize_recent(texts) == [(0, "first"), (2, "second"), (4, "third")]